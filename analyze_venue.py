@@ -1,3 +1,6 @@
+import argparse
+import json
+
 from engine.metric_selector import MetricSelector
 from engine.single_metric_calculator import SingleMetricCalculator
 from engine.scorer import Scorer
@@ -13,16 +16,49 @@ def main():
         return
 
     metrics_with_weights = MetricSelector.get_metrics_for_category(category)
-    
+    results = SingleMetricCalculator.calculate_all(metrics_with_weights, location)
+
     raw_scores = []
     for metric, weight in metrics_with_weights.items():
-        value = SingleMetricCalculator.calculate(metric, location)
-        raw_scores.append((metric, value, weight))
+        result = results[metric]
+        if not result.ok:
+            print(f"Skipping {metric}: {result.error}")
+            continue
+        raw_scores.append((metric, result.value, weight))
 
     final_score, breakdown = Scorer.score(raw_scores)
     
     result = ResultFormatter.format(final_score, breakdown)
     print(result)
 
+def batch_main(args):
+    # Imported here so the interactive prompt does not pay for the batch machinery
+    from engine.batch_runner import run_batch
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        output_format=args.format,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        checkpoint_path=args.checkpoint,
+        timeout=args.timeout,
+    )
+    print(json.dumps(summary, indent=2))
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Score a venue interactively, or a file of candidate sites with --input"
+    )
+    parser.add_argument("--input", help="CSV or JSONL of sites: category plus location/address or lat,lng")
+    parser.add_argument("--output", default="results.jsonl", help="Results file (.jsonl, .csv or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "parquet"], help="Defaults to the output extension")
+    parser.add_argument("--workers", type=int, default=4, help="Sites scored in parallel")
+    parser.add_argument("--max-in-flight", type=int, help="Sites queued or running at once (default 2x workers)")
+    parser.add_argument("--checkpoint", help="Resume file of finished site ids (default <output>.checkpoint)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-site metric deadline in seconds")
+    args = parser.parse_args()
+    if args.input:
+        batch_main(args)
+    else:
+        main()
@@ -0,0 +1,110 @@
+"""
+Citywide competitor-density sweep.
+
+Tiles a bounding box into square cells, counts the places of one business
+category in each cell with restricted Places searches, and writes the result
+as a density grid that the API serves from /api/v1/competitors/density.
+
+Usage (from the competitor-analysis directory):
+    python density_sweep.py --category cafe \\
+        --bbox 45.35,-75.80,45.45,-75.60 --cell-size-m 1000 \\
+        --concurrency 4 --max-cost 5.00
+
+The sweep checkpoints its progress under <output-dir>/checkpoints/; running the same
+command again resumes it, e.g. after the budget ran out or it was interrupted.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add the parent directory to Python path to import the shared utils package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.density_grid import DensityGridStore
+from services.density_sweep import DensitySweep, SweepBudget, sweep_resilience
+from services.places_service import PlacesService
+from utils.http_clients import HttpClientRegistry
+from utils.place_store import PlaceStore
+
+def parse_bbox(value: str):
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("expected min_lat,min_lng,max_lat,max_lng")
+    min_lat, min_lng, max_lat, max_lng = parts
+    if min_lat >= max_lat or min_lng >= max_lng:
+        raise argparse.ArgumentTypeError("bbox minimums must be below its maximums")
+    return min_lat, min_lng, max_lat, max_lng
+
+async def run(args) -> dict:
+    api_key = os.getenv("GOOGLE_PLACES_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_PLACES_API_KEY is not set")
+
+    grid_store = DensityGridStore(args.output_dir)
+    output_path = grid_store.path_for(args.category)
+    checkpoint_path = grid_store.checkpoint_path_for(args.category)
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+
+    http_clients = HttpClientRegistry()
+    place_store = PlaceStore.from_env()
+    places_service = PlacesService(
+        api_key=api_key,
+        http_clients=http_clients,
+        max_total_results=int(os.getenv("PLACES_MAX_RESULTS", "60")),
+        place_store=place_store,
+        resilience=sweep_resilience()
+    )
+    sweep = DensitySweep(
+        places_service,
+        category=args.category,
+        bbox=args.bbox,
+        cell_size_m=args.cell_size_m,
+        concurrency=args.concurrency,
+        max_depth=args.max_depth,
+        budget=SweepBudget(
+            max_requests=args.max_requests,
+            max_cost=args.max_cost,
+            cost_per_request=args.cost_per_request
+        ),
+        checkpoint_path=checkpoint_path
+    )
+    try:
+        grid = await sweep.run()
+    finally:
+        await http_clients.aclose()
+        place_store.close()
+
+    grid.save(output_path)
+    if not sweep.pending and os.path.exists(sweep.checkpoint_path):
+        os.remove(sweep.checkpoint_path)
+    return dict(grid.stats, output=output_path)
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Sweep an area for competitor density")
+    parser.add_argument("--category", required=True, help="Business category to count, e.g. cafe")
+    parser.add_argument("--bbox", required=True, type=parse_bbox, help="min_lat,min_lng,max_lat,max_lng")
+    parser.add_argument("--cell-size-m", type=float, default=1000, help="Grid cell size in meters")
+    parser.add_argument("--concurrency", type=int, default=4, help="Cells searched at the same time")
+    parser.add_argument("--max-depth", type=int, default=2,
+                        help="How many times a cell with a full result page may be split into quarters")
+    parser.add_argument("--max-requests", type=int, help="Places request quota for the whole sweep, across resumes")
+    parser.add_argument("--max-cost", type=float, help="Cost budget for the whole sweep, across resumes")
+    parser.add_argument("--cost-per-request", type=float, default=0.032, help="Estimated cost of one Places request")
+    parser.add_argument("--output-dir", default=os.getenv("DENSITY_GRID_DIR", "density_grids"),
+                        help="Directory of density grids served by the API")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    summary = asyncio.run(run(args))
+    print(json.dumps(summary, indent=2))
+    if not summary["complete"]:
+        print("Sweep stopped before covering every cell; run the same command again to resume.")
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,68 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import json
 import os
+import sys
 from dotenv import load_dotenv
 
+# Add the parent directory to Python path to import the shared utils package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
 from services.places_service import PlacesService
 from services.tavily_service import TavilyService
 from services.analysis_service import AnalysisService
-from models.competitor_models import CompetitorAnalysisRequest, CompetitorAnalysisResponse
+from services.analysis_cache import AnalysisCache
+from services.job_queue import Job, JobQueue, QueueFullError
+from services.density_grid import DensityGridStore
+from models.competitor_models import (
+    AnalysisJobResponse,
+    CompetitorAnalysisRequest,
+    CompetitorAnalysisResponse,
+    CompetitorDensityResponse
+)
+from utils.http_clients import HttpClientRegistry
+from utils.places_cache import PlacesSearchCache
+from utils.place_store import PlaceStore
+from utils.resilience import CircuitOpenError, ResilienceRegistry, deadline
 
 load_dotenv()
 
-app = FastAPI(title="Business Competitor Analysis API", version="1.0.0")
+# Pooled HTTP clients shared by every service, closed when the app shuts down
+http_clients = HttpClientRegistry()
+
+# Places text-search cache, configured through PLACES_CACHE_* environment variables
+places_cache = PlacesSearchCache.from_env()
+
+# Local spatial store of observed places, configured through PLACE_STORE_* environment variables
+place_store = PlaceStore.from_env()
+
+# Circuit breakers, deadline-aware timeouts, retries and hedging for every upstream
+resilience = ResilienceRegistry.from_env()
+
+# Upper bound on the upstream time a single synchronous request may spend
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+
+# Precomputed competitor-density grids written by density_sweep.py
+density_grids = DensityGridStore(os.getenv("DENSITY_GRID_DIR", "density_grids"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await http_clients.aclose()
+    places_cache.close()
+    place_store.close()
+    if analysis_cache:
+        analysis_cache.close()
+
+app = FastAPI(title="Business Competitor Analysis API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,51 +72,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-tavily_service = TavilyService(api_key=os.getenv("TAVILY_API_KEY")) if os.getenv("TAVILY_API_KEY") else None
-analysis_service = AnalysisService(openai_api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+# Initialize services; the analysis cache (and its SQLite file) only exists when LLM analysis is enabled
+analysis_cache = AnalysisCache(
+    db_path=os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.sqlite3"),
+    ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000")),
+    similarity_threshold=float(os.getenv("ANALYSIS_CACHE_SIMILARITY", "0.9")),
+    staleness_seconds=float(os.getenv("ANALYSIS_CACHE_STALENESS_SECONDS", str(3 * 24 * 3600)))
+) if os.getenv("OPENAI_API_KEY") else None
+tavily_service = TavilyService(
+    api_key=os.getenv("TAVILY_API_KEY"),
+    http_clients=http_clients,
+    concurrency=int(os.getenv("TAVILY_CONCURRENCY", "3")),
+    resilience=resilience
+) if os.getenv("TAVILY_API_KEY") else None
+analysis_service = AnalysisService(
+    openai_api_key=os.getenv("OPENAI_API_KEY"),
+    concurrency=int(os.getenv("OPENAI_CONCURRENCY", "5")),
+    timeout_seconds=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20")),
+    cache=analysis_cache,
+    batch_size=int(os.getenv("OPENAI_BATCH_SIZE", "5")),
+    resilience=resilience
+) if os.getenv("OPENAI_API_KEY") else None
 places_service = PlacesService(
     api_key=os.getenv("GOOGLE_PLACES_API_KEY"),
     tavily_service=tavily_service,
-    analysis_service=analysis_service
+    analysis_service=analysis_service,
+    http_clients=http_clients,
+    places_cache=places_cache,
+    max_total_results=int(os.getenv("PLACES_MAX_RESULTS", "60")),
+    place_store=place_store,
+    resilience=resilience
+)
+
+# Background workers for deep analyses submitted through /api/v1/competitors/jobs
+job_queue = JobQueue(
+    handler=places_service.analyze_competitors,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+    result_ttl_seconds=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
 )
 
+class ClientDisconnected(Exception):
+    pass
+
+async def run_until_disconnected(http_request: Request, coro, poll_seconds: float = 0.5):
+    """
+    Await `coro`, cancelling it if the client disconnects before it finishes
+    so abandoned requests stop spending Places, Tavily and LLM calls.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
 @app.post("/api/v1/competitors/analyze", response_model=CompetitorAnalysisResponse)
-async def analyze_competitors(request: CompetitorAnalysisRequest):
+async def analyze_competitors(request: CompetitorAnalysisRequest, http_request: Request):
     try:
-        analysis = await places_service.analyze_competitors(request)
+        with deadline(REQUEST_DEADLINE_SECONDS):
+            analysis = await run_until_disconnected(http_request, places_service.analyze_competitors(request))
         return analysis
+    except ClientDisconnected:
+        # Nobody is listening anymore; 499 is the conventional "client closed request"
+        return Response(status_code=499)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e) or "Upstream request timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/competitors/analyze/stream")
+async def analyze_competitors_stream(request: CompetitorAnalysisRequest):
+    """
+    Streaming variant of /api/v1/competitors/analyze. Responds with NDJSON:
+    one "query_info" line, one "competitor" line per competitor as soon as its
+    enrichment finishes, then a final "market_insights" line. Errors after
+    the stream has started are reported as an "error" line.
+    """
+    async def ndjson_events():
+        try:
+            async for event in places_service.stream_competitor_analysis(request):
+                event["data"] = event["data"].model_dump(mode="json")
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+    
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+def job_response(job: Job) -> AnalysisJobResponse:
+    def timestamp(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value) if value is not None else None
+    
+    return AnalysisJobResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=timestamp(job.created_at),
+        started_at=timestamp(job.started_at),
+        finished_at=timestamp(job.finished_at),
+        result=job.result,
+        error=job.error
+    )
+
+@app.post("/api/v1/competitors/jobs", response_model=AnalysisJobResponse, status_code=202)
+async def submit_analysis_job(
+    request: CompetitorAnalysisRequest,
+    priority: int = Query(default=5, ge=0, le=9, description="Lower values run first")
+):
+    """
+    Queue a competitor analysis and return its job id immediately. Identical
+    requests that are still pending share one job.
+    """
+    try:
+        job = job_queue.submit(request, priority=priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job_response(job)
+
+@app.get("/api/v1/competitors/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(
+    job_id: str,
+    wait: float = Query(default=0, ge=0, le=60, description="Seconds to wait for the job to finish")
+):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if wait and not job.finished:
+        await job_queue.wait(job, timeout=wait)
+    return job_response(job)
+
+@app.get("/api/v1/competitors/jobs/{job_id}/events")
+async def subscribe_analysis_job(job_id: str):
+    """Server-sent events: the current job status now, then the final result once it finishes."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    
+    async def sse_events():
+        yield f"event: status\ndata: {job_response(job).model_dump_json()}\n\n"
+        if not job.finished:
+            await job.done.wait()
+            yield f"event: status\ndata: {job_response(job).model_dump_json()}\n\n"
+    
+    return StreamingResponse(sse_events(), media_type="text/event-stream")
+
 class CompetitorCountRequest(BaseModel):
     business_type: str
     location: str
-    max_results: int = 20
+    max_results: int = Field(default=20, ge=1, le=60)
     min_rating: float = 0.0
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    radius_meters: float = Field(default=1000, gt=0, le=50000)
 
 class CompetitorCountResponse(BaseModel):
     competitor_count: int
     business_type: str
     location: str
     search_query: str
+    source: str = "places_api"
 
 @app.post("/api/v1/competitors/count", response_model=CompetitorCountResponse)
 async def count_competitors(request: CompetitorCountRequest):
     """
     Simple endpoint to count competitors in an area without full analysis.
     Returns just the number of competitors found.
+    
+    When latitude/longitude are given the count is for a circle of
+    `radius_meters` and is answered from the local place store whenever a
+    fresh, complete search already covers that circle.
     """
     try:
         search_query = f"{request.business_type} in {request.location}"
         
-        # Use the places service to search but only get the count
-        places_data = await places_service._search_places(
-            query=search_query,
-            max_results=request.max_results,
-            min_rating=request.min_rating,
-            open_now=False
-        )
+        if request.latitude is not None and request.longitude is not None:
+            with deadline(REQUEST_DEADLINE_SECONDS):
+                competitor_count, source = await places_service.count_in_area(
+                    category=request.business_type,
+                    latitude=request.latitude,
+                    longitude=request.longitude,
+                    radius_meters=request.radius_meters,
+                    min_rating=request.min_rating
+                )
+            return CompetitorCountResponse(
+                competitor_count=competitor_count,
+                business_type=request.business_type,
+                location=request.location,
+                search_query=search_query,
+                source=source
+            )
+        
+        # Use the places service to search but only get the count, paging
+        # with the "count" field-mask profile since only place ids are needed
+        with deadline(REQUEST_DEADLINE_SECONDS):
+            places_data = await places_service._search_places(
+                query=search_query,
+                max_results=request.max_results,
+                min_rating=request.min_rating,
+                open_now=False,
+                profile="count",
+                category=request.business_type
+            )
         
         competitor_count = len(places_data)
         
@@ -76,9 +289,58 @@ async def count_competitors(request: CompetitorCountRequest):
             location=request.location,
             search_query=search_query
         )
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e) or "Upstream request timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/competitors/density", response_model=CompetitorDensityResponse)
+async def get_competitor_density(
+    business_type: str,
+    latitude: Optional[float] = Query(default=None, ge=-90, le=90),
+    longitude: Optional[float] = Query(default=None, ge=-180, le=180),
+    limit: int = Query(default=10, ge=1, le=100),
+    ascending: bool = False
+):
+    """
+    Look up the precomputed competitor-density grid for a business type.
+    With latitude/longitude, returns the cell containing that point;
+    otherwise the `limit` densest cells (or sparsest with `ascending=true`).
+    """
+    grid = density_grids.get(business_type)
+    if grid is None:
+        raise HTTPException(status_code=404, detail=f"No density grid for '{business_type}'; run density_sweep.py first")
+    
+    cell = None
+    top_cells = []
+    if latitude is not None and longitude is not None:
+        cell = grid.lookup(latitude, longitude)
+        if cell is None:
+            raise HTTPException(status_code=404, detail="Point is outside the density grid")
+    else:
+        top_cells = grid.top_cells(limit, ascending)
+    
+    return CompetitorDensityResponse(
+        business_type=grid.category,
+        cell_size_m=grid.cell_size_m,
+        generated_at=datetime.fromtimestamp(grid.created_at) if grid.created_at else None,
+        complete=grid.stats.get("complete", False),
+        cell=cell,
+        top_cells=top_cells
+    )
+
+@app.get("/api/v1/competitors/metrics")
+async def get_metrics():
+    return {
+        "places_cache": places_cache.stats(),
+        "place_store": place_store.stats(),
+        "analysis_cache": analysis_cache.stats() if analysis_cache else None,
+        "job_queue": job_queue.stats(),
+        "resilience": resilience.stats()
+    }
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
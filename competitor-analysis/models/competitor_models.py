@@ -1,15 +1,19 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 from datetime import datetime
 
 class CompetitorAnalysisRequest(BaseModel):
     business_type: str = Field(..., description="Type of business (e.g., 'cafe', 'restaurant')")
     location: str = Field(..., description="Location to search (e.g., 'centretown ottawa')")
     radius_meters: int = Field(default=1000, ge=100, le=50000, description="Search radius in meters")
-    max_results: int = Field(default=10, ge=1, le=20, description="Maximum number of competitors to return")
+    max_results: int = Field(default=10, ge=1, le=60, description="Maximum number of competitors to return")
     min_rating: float = Field(default=0.0, ge=0.0, le=5.0, description="Minimum rating filter")
     open_now: bool = Field(default=False, description="Filter for currently open businesses")
     enable_deep_analysis: bool = Field(default=True, description="Enable Phase 2 deep competitor analysis")
+    analysis_mode: Literal["per_competitor", "batched"] = Field(
+        default="per_competitor",
+        description="Run one LLM call per competitor, or pack several competitors into each call"
+    )
 
 class OpeningHours(BaseModel):
     open_now: bool
@@ -32,6 +36,15 @@ class TavilyResponse(BaseModel):
     query: str
     ai_answer: Optional[str] = None
     results: List[TavilySearchResult] = []
+    # Set when the search failed, so a failure is not mistaken for "no web presence"
+    error: Optional[str] = None
+
+class BatchAnalysisItem(BaseModel):
+    id: str
+    analysis: str = Field(..., min_length=1)
+
+class BatchAnalysisResult(BaseModel):
+    analyses: List[BatchAnalysisItem]
 
 class Competitor(BaseModel):
     name: str
@@ -48,6 +61,7 @@ class Competitor(BaseModel):
     competitor_analysis: Optional[str] = None
     data_sources: List[str] = []
     analysis_confidence: Optional[float] = None
+    research_error: Optional[str] = None
 
 class QueryInfo(BaseModel):
     business_type: str
@@ -68,4 +82,28 @@ class MarketInsights(BaseModel):
 class CompetitorAnalysisResponse(BaseModel):
     query_info: QueryInfo
     competitors: List[Competitor]
-    market_insights: MarketInsights
\ No newline at end of file
+    market_insights: MarketInsights
+
+class AnalysisJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[CompetitorAnalysisResponse] = None
+    error: Optional[str] = None
+
+class DensityCell(BaseModel):
+    row: int
+    col: int
+    competitor_count: int
+    center: Dict[str, float]
+    bounds: Dict[str, float]
+
+class CompetitorDensityResponse(BaseModel):
+    business_type: str
+    cell_size_m: float
+    generated_at: Optional[datetime] = None
+    complete: bool
+    cell: Optional[DensityCell] = None
+    top_cells: List[DensityCell] = []
@@ -0,0 +1,152 @@
+import asyncio
+import difflib
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class AnalysisCache:
+    """
+    Persistent, content-addressed cache of competitor LLM analyses.
+
+    Entries are keyed by a hash of the analysis context together with the
+    model and prompt version, so any change to the inputs or the prompt
+    produces a new key. When the exact context is not cached, a previous
+    analysis of the same competitor is reused if its context is at least
+    `similarity_threshold` similar and it is younger than `staleness_seconds`
+    (e.g. after a minor review change).
+
+    Lookups run blocking sqlite queries and difflib comparisons, so async
+    code should use `aget`/`aput`, which run them in a worker thread. Only
+    the `max_candidates` most recent entries of similar length are compared.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "analysis_cache.sqlite3",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 5000,
+        similarity_threshold: float = 0.9,
+        staleness_seconds: float = 3 * 24 * 3600,
+        max_candidates: int = 20
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.staleness_seconds = staleness_seconds
+        self.max_candidates = max_candidates
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " key TEXT PRIMARY KEY, subject TEXT NOT NULL, model TEXT NOT NULL,"
+            " prompt_version TEXT NOT NULL, context TEXT NOT NULL, analysis TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_subject ON analyses (subject, model, prompt_version)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(context: str, model: str, prompt_version: str) -> str:
+        raw = "\x1f".join([model, prompt_version, context])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, subject: str, context: str, model: str, prompt_version: str) -> Optional[str]:
+        """Return a cached analysis for the context, or a near-duplicate's, or None."""
+        now = time.time()
+        key = self.make_key(context, model, prompt_version)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis FROM analyses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row:
+                self._touch(key, now)
+                self.hits += 1
+                return row[0]
+
+            # ratio() <= 2*min(len)/(len_a + len_b), so contexts whose length
+            # differs too much can never reach the threshold
+            threshold = min(max(self.similarity_threshold, 1e-6), 1.0)
+            length_factor = threshold / (2 - threshold)
+            candidates = self._conn.execute(
+                "SELECT key, context, analysis FROM analyses"
+                " WHERE subject = ? AND model = ? AND prompt_version = ? AND created_at >= ?"
+                " AND length(context) BETWEEN ? AND ?"
+                " ORDER BY created_at DESC LIMIT ?",
+                (subject, model, prompt_version, now - min(self.ttl_seconds, self.staleness_seconds),
+                 len(context) * length_factor, len(context) / length_factor,
+                 self.max_candidates)
+            ).fetchall()
+
+        # Compared outside the lock so other lookups are not held up
+        for candidate_key, candidate_context, analysis in candidates:
+            matcher = difflib.SequenceMatcher(None, context, candidate_context, autojunk=False)
+            if (matcher.real_quick_ratio() >= self.similarity_threshold
+                    and matcher.quick_ratio() >= self.similarity_threshold
+                    and matcher.ratio() >= self.similarity_threshold):
+                with self._lock:
+                    self._touch(candidate_key, now)
+                    self.near_hits += 1
+                return analysis
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def aget(self, subject: str, context: str, model: str, prompt_version: str) -> Optional[str]:
+        """`get` in a worker thread, keeping the event loop free."""
+        return await asyncio.to_thread(self.get, subject, context, model, prompt_version)
+
+    async def aput(self, subject: str, context: str, model: str, prompt_version: str, analysis: str) -> None:
+        """`put` in a worker thread, keeping the event loop free."""
+        await asyncio.to_thread(self.put, subject, context, model, prompt_version, analysis)
+
+    def put(self, subject: str, context: str, model: str, prompt_version: str, analysis: str) -> None:
+        now = time.time()
+        key = self.make_key(context, model, prompt_version)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses"
+                " (key, subject, model, prompt_version, context, analysis, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, subject, model, prompt_version, context, analysis, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.near_hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _touch(self, key: str, now: float) -> None:
+        self._conn.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        # Drop expired entries, then the least recently used beyond max_entries
+        self._conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM analyses WHERE key IN ("
+            " SELECT key FROM analyses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
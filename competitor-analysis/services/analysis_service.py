@@ -1,10 +1,57 @@
+import asyncio
+import json
+import logging
 import openai
-from typing import List, Dict, Any
-from models.competitor_models import Competitor, Review, TavilyResponse
+from pydantic import ValidationError
+from typing import List, Dict, Any, Optional
+from models.competitor_models import (
+    BatchAnalysisResult,
+    Competitor,
+    TavilyResponse
+)
+from services.analysis_cache import AnalysisCache
+from utils.resilience import ResilienceRegistry, is_upstream_failure
+
+logger = logging.getLogger(__name__)
 
 class AnalysisService:
-    def __init__(self, openai_api_key: str):
-        self.client = openai.OpenAI(api_key=openai_api_key)
+    MODEL = "gpt-3.5-turbo"
+    # Bump whenever SYSTEM_PROMPT or the context format changes so cached
+    # analyses produced by the old prompt are no longer reused
+    PROMPT_VERSION = "1"
+    SYSTEM_PROMPT = """You are a business analyst specializing in competitive intelligence. 
+        
+        Analyze the provided competitor data and generate a concise 3-4 sentence competitive analysis that covers:
+        1. Market positioning & unique value proposition
+        2. Customer sentiment & reputation based on reviews/ratings
+        3. Competitive strengths and potential weaknesses
+        4. Overall threat level and competitive assessment
+        
+        Be specific, actionable, and focus on insights that would help a business owner understand this competitor's market position.
+        Keep the analysis professional and fact-based."""
+    BATCH_PROMPT_VERSION = "1-batch"
+    BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+        
+        You will receive several competitors, each introduced by a line "### Competitor <id>".
+        Write one analysis per competitor and respond with a JSON object of the form
+        {"analyses": [{"id": "<id>", "analysis": "<3-4 sentence analysis>"}]}
+        containing exactly one entry for every competitor id you were given."""
+    
+    def __init__(
+        self,
+        openai_api_key: str,
+        concurrency: int = 5,
+        timeout_seconds: float = 20.0,
+        cache: Optional[AnalysisCache] = None,
+        batch_size: int = 5,
+        resilience: Optional[ResilienceRegistry] = None
+    ):
+        self.client = openai.AsyncOpenAI(api_key=openai_api_key, max_retries=1)
+        self.concurrency = max(1, concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.resilience = resilience or ResilienceRegistry()
         
     async def generate_competitor_analysis(
         self, 
@@ -17,8 +64,8 @@ class AnalysisService:
         # Prepare context for LLM
         context = self._build_analysis_context(competitor, tavily_data, business_type, location)
         
-        # Generate analysis
-        analysis_text = await self._generate_analysis(context)
+        # Generate analysis, reusing a cached one for the same competitor when possible
+        analysis_text = await self._generate_analysis(context, subject=competitor.place_id or competitor.name)
         
         # Calculate confidence score
         confidence = self._calculate_confidence(competitor, tavily_data)
@@ -72,34 +119,52 @@ class AnalysisService:
         
         return "\n".join(context_parts)
     
-    async def _generate_analysis(self, context: str) -> str:
-        system_prompt = """You are a business analyst specializing in competitive intelligence. 
-        
-        Analyze the provided competitor data and generate a concise 3-4 sentence competitive analysis that covers:
-        1. Market positioning & unique value proposition
-        2. Customer sentiment & reputation based on reviews/ratings
-        3. Competitive strengths and potential weaknesses
-        4. Overall threat level and competitive assessment
-        
-        Be specific, actionable, and focus on insights that would help a business owner understand this competitor's market position.
-        Keep the analysis professional and fact-based."""
+    async def _generate_analysis(self, context: str, subject: str = None) -> str:
+        if self.cache and subject:
+            cached = await self.cache.aget(subject, context, self.MODEL, self.PROMPT_VERSION)
+            if cached is not None:
+                return cached
         
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            analysis = await self._complete(context)
+        except Exception:
+            # Fallback analysis if LLM fails (not cached, so the next request retries)
+            return self._generate_fallback_analysis(context)
+        
+        if self.cache and subject:
+            await self.cache.aput(subject, context, self.MODEL, self.PROMPT_VERSION, analysis)
+        return analysis
+    
+    async def _complete(self, context: str) -> str:
+        response = await self._create_completion(
+            lambda: self.client.chat.completions.create(
+                model=self.MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": context}
                 ],
                 max_tokens=200,
-                temperature=0.3
+                temperature=0.3,
+                timeout=self.timeout_seconds
             )
-            
-            return response.choices[0].message.content.strip()
+        )
         
-        except Exception as e:
-            # Fallback analysis if LLM fails
-            return self._generate_fallback_analysis(context)
+        return response.choices[0].message.content.strip()
+    
+    async def _create_completion(self, create) -> Any:
+        # Completions are billed per call, so they are neither retried here
+        # (the SDK already retries once) nor hedged; the breaker still fails
+        # fast while OpenAI is down and the timeout honours request deadlines
+        return await self.resilience.get("openai").call(
+            create,
+            idempotent=False,
+            timeout=self.timeout_seconds,
+            failure=self._is_upstream_failure
+        )
+    
+    @staticmethod
+    def _is_upstream_failure(error: BaseException) -> bool:
+        return isinstance(error, openai.APIConnectionError) or is_upstream_failure(error)
     
     def _generate_fallback_analysis(self, context: str) -> str:
         # Simple rule-based analysis as fallback
@@ -140,6 +205,33 @@ class AnalysisService:
         
         return min(confidence_score, 1.0)
     
+    async def analyze_competitor(
+        self,
+        competitor: Competitor,
+        tavily_data: TavilyResponse,
+        business_type: str,
+        location: str
+    ) -> Competitor:
+        if tavily_data.error:
+            return self._mark_research_failed(competitor, tavily_data)
+        try:
+            analysis_result = await self.generate_competitor_analysis(
+                competitor, tavily_data, business_type, location
+            )
+            
+            # Update competitor with analysis
+            competitor.competitor_analysis = analysis_result["analysis"]
+            competitor.analysis_confidence = analysis_result["confidence"]
+            competitor.data_sources = analysis_result["data_sources"]
+            
+        except Exception:
+            # Set fallback values on error
+            competitor.competitor_analysis = "Analysis unavailable due to processing error."
+            competitor.analysis_confidence = 0.1
+            competitor.data_sources = []
+        
+        return competitor
+    
     async def batch_analyze_competitors(
         self, 
         competitors: List[Competitor], 
@@ -147,26 +239,125 @@ class AnalysisService:
         business_type: str,
         location: str
     ) -> List[Competitor]:
+        # Run the LLM calls concurrently, at most `concurrency` at a time.
+        # Cancelling this coroutine (e.g. on client disconnect) cancels them all.
+        semaphore = asyncio.Semaphore(self.concurrency)
         
-        enhanced_competitors = []
+        async def analyze(competitor: Competitor, tavily_data: TavilyResponse) -> Competitor:
+            async with semaphore:
+                return await self.analyze_competitor(competitor, tavily_data, business_type, location)
         
+        return await asyncio.gather(*(
+            analyze(competitor, tavily_data)
+            for competitor, tavily_data in zip(competitors, tavily_responses)
+        ))
+    
+    async def batch_analyze_competitors_packed(
+        self,
+        competitors: List[Competitor],
+        tavily_responses: List[TavilyResponse],
+        business_type: str,
+        location: str
+    ) -> List[Competitor]:
+        """
+        Analyze competitors with up to `batch_size` of them packed into each
+        chat completion, so the system prompt is sent once per batch instead
+        of once per competitor. The JSON response is validated and mapped
+        back by id; competitors whose entry is missing or invalid fall back
+        to a regular per-competitor call.
+        """
+        pending = []
         for competitor, tavily_data in zip(competitors, tavily_responses):
-            try:
-                analysis_result = await self.generate_competitor_analysis(
-                    competitor, tavily_data, business_type, location
-                )
-                
-                # Update competitor with analysis
-                competitor.competitor_analysis = analysis_result["analysis"]
-                competitor.analysis_confidence = analysis_result["confidence"]
-                competitor.data_sources = analysis_result["data_sources"]
-                
-            except Exception as e:
-                # Set fallback values on error
-                competitor.competitor_analysis = "Analysis unavailable due to processing error."
-                competitor.analysis_confidence = 0.1
-                competitor.data_sources = []
+            if tavily_data.error:
+                self._mark_research_failed(competitor, tavily_data)
+                continue
+            context = self._build_analysis_context(competitor, tavily_data, business_type, location)
+            subject = competitor.place_id or competitor.name
+            cached = None
+            if self.cache:
+                cached = await self.cache.aget(subject, context, self.MODEL, self.BATCH_PROMPT_VERSION)
+            if cached is not None:
+                self._apply_analysis(competitor, tavily_data, cached)
+            else:
+                pending.append((competitor, tavily_data, context, subject))
+        
+        # Packed requests and their per-competitor fallbacks share one cap on
+        # concurrent LLM calls
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def analyze_one(competitor: Competitor, tavily_data: TavilyResponse) -> None:
+            async with semaphore:
+                await self.analyze_competitor(competitor, tavily_data, business_type, location)
+        
+        async def analyze_batch(batch) -> None:
+            async with semaphore:
+                try:
+                    analyses = await self._complete_batch([context for _, _, context, _ in batch])
+                except Exception as e:
+                    logger.warning("Batched competitor analysis failed: %s", e)
+                    analyses = {}
+            
+            retries = []
+            for index, (competitor, tavily_data, context, subject) in enumerate(batch):
+                analysis = analyses.get(str(index))
+                if analysis is None:
+                    retries.append(analyze_one(competitor, tavily_data))
+                    continue
+                if self.cache:
+                    await self.cache.aput(subject, context, self.MODEL, self.BATCH_PROMPT_VERSION, analysis)
+                self._apply_analysis(competitor, tavily_data, analysis)
             
-            enhanced_competitors.append(competitor)
+            await asyncio.gather(*retries)
+        
+        await asyncio.gather(*(
+            analyze_batch(pending[i:i + self.batch_size])
+            for i in range(0, len(pending), self.batch_size)
+        ))
+        
+        return list(competitors)
+    
+    async def _complete_batch(self, contexts: List[str]) -> Dict[str, str]:
+        """Return {id: analysis} for the entries of a packed request that validate."""
+        user_content = "\n\n".join(
+            f"### Competitor {index}\n{context}" for index, context in enumerate(contexts)
+        )
+        response = await self._create_completion(
+            lambda: self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=[
+                    {"role": "system", "content": self.BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
+                ],
+                response_format={"type": "json_object"},
+                max_tokens=200 * len(contexts),
+                temperature=0.3,
+                timeout=self.timeout_seconds
+            )
+        )
+        
+        try:
+            result = BatchAnalysisResult.model_validate(json.loads(response.choices[0].message.content))
+        except (TypeError, ValueError, ValidationError) as e:
+            logger.warning("Discarding unparseable batched analysis response: %s", e)
+            return {}
         
-        return enhanced_competitors
\ No newline at end of file
+        valid_ids = {str(index) for index in range(len(contexts))}
+        return {
+            item.id: item.analysis.strip()
+            for item in result.analyses
+            if item.id in valid_ids and item.analysis.strip()
+        }
+    
+    @staticmethod
+    def _mark_research_failed(competitor: Competitor, tavily_data: TavilyResponse) -> Competitor:
+        # Without research the analysis would be guesswork; report the failure instead
+        competitor.research_error = tavily_data.error
+        competitor.competitor_analysis = None
+        competitor.analysis_confidence = 0.0
+        competitor.data_sources = []
+        return competitor
+    
+    def _apply_analysis(self, competitor: Competitor, tavily_data: TavilyResponse, analysis: str) -> None:
+        competitor.competitor_analysis = analysis
+        competitor.analysis_confidence = self._calculate_confidence(competitor, tavily_data)
+        competitor.data_sources = [result.url for result in tavily_data.results]
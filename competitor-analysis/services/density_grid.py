@@ -0,0 +1,159 @@
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.place_store import normalize_category
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+class DensityGrid:
+    """
+    Competitor counts for one business category on a regular lat/lng grid.
+
+    Row 0 is the southern edge of the bounding box and column 0 the western
+    edge. Cells are `cell_size_m` on a side at the box's centre latitude.
+    Grids are produced by the density sweep job (density_sweep.py) and saved
+    as JSON.
+    """
+
+    def __init__(
+        self,
+        category: str,
+        bbox: Tuple[float, float, float, float],
+        cell_size_m: float,
+        counts: Optional[List[List[int]]] = None,
+        created_at: Optional[float] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ):
+        self.category = category
+        self.min_lat, self.min_lng, self.max_lat, self.max_lng = bbox
+        self.cell_size_m = cell_size_m
+        center_lat = (self.min_lat + self.max_lat) / 2
+        self.cell_lat = cell_size_m / METERS_PER_DEGREE_LAT
+        self.cell_lng = cell_size_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(center_lat)), 1e-6))
+        self.rows = max(1, math.ceil((self.max_lat - self.min_lat) / self.cell_lat))
+        self.cols = max(1, math.ceil((self.max_lng - self.min_lng) / self.cell_lng))
+        self.counts = counts or [[0] * self.cols for _ in range(self.rows)]
+        self.created_at = created_at
+        self.stats = stats or {}
+
+    @property
+    def bbox(self) -> Tuple[float, float, float, float]:
+        return self.min_lat, self.min_lng, self.max_lat, self.max_lng
+
+    def cell_of(self, latitude: float, longitude: float) -> Optional[Tuple[int, int]]:
+        """Return (row, col) of the cell containing the point, or None outside the grid."""
+        if not (self.min_lat <= latitude <= self.max_lat and self.min_lng <= longitude <= self.max_lng):
+            return None
+        row = min(int((latitude - self.min_lat) / self.cell_lat), self.rows - 1)
+        col = min(int((longitude - self.min_lng) / self.cell_lng), self.cols - 1)
+        return row, col
+
+    def cell_bounds(self, row: int, col: int) -> Tuple[float, float, float, float]:
+        """(min_lat, min_lng, max_lat, max_lng) of a cell, clipped to the grid's box."""
+        min_lat = self.min_lat + row * self.cell_lat
+        min_lng = self.min_lng + col * self.cell_lng
+        return (
+            min_lat, min_lng,
+            min(min_lat + self.cell_lat, self.max_lat), min(min_lng + self.cell_lng, self.max_lng)
+        )
+
+    def add(self, latitude: float, longitude: float) -> bool:
+        cell = self.cell_of(latitude, longitude)
+        if cell is None:
+            return False
+        row, col = cell
+        self.counts[row][col] += 1
+        return True
+
+    def cell(self, row: int, col: int) -> Dict[str, Any]:
+        min_lat, min_lng, max_lat, max_lng = self.cell_bounds(row, col)
+        return {
+            "row": row,
+            "col": col,
+            "competitor_count": self.counts[row][col],
+            "center": {"latitude": (min_lat + max_lat) / 2, "longitude": (min_lng + max_lng) / 2},
+            "bounds": {"min_lat": min_lat, "min_lng": min_lng, "max_lat": max_lat, "max_lng": max_lng}
+        }
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        cell = self.cell_of(latitude, longitude)
+        return self.cell(*cell) if cell else None
+
+    def top_cells(self, limit: int = 10, ascending: bool = False) -> List[Dict[str, Any]]:
+        """The `limit` densest cells, or the sparsest with `ascending=True`."""
+        cells = [(self.counts[r][c], r, c) for r in range(self.rows) for c in range(self.cols)]
+        cells.sort(key=lambda item: item[0], reverse=not ascending)
+        return [self.cell(r, c) for _, r, c in cells[:limit]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "category": self.category,
+            "bbox": list(self.bbox),
+            "cell_size_m": self.cell_size_m,
+            "rows": self.rows,
+            "cols": self.cols,
+            "counts": self.counts,
+            "created_at": self.created_at,
+            "stats": self.stats
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DensityGrid":
+        return cls(
+            category=data["category"],
+            bbox=tuple(data["bbox"]),
+            cell_size_m=data["cell_size_m"],
+            counts=data["counts"],
+            created_at=data.get("created_at"),
+            stats=data.get("stats")
+        )
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DensityGrid":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+class DensityGridStore:
+    """
+    Read-only view over a directory of precomputed grids, one
+    `<category>.json` file per business category. A file is re-read when its
+    modification time changes, so a finished sweep is picked up without
+    restarting the service.
+    """
+
+    CHECKPOINT_DIR = "checkpoints"
+
+    def __init__(self, directory: str = "density_grids"):
+        self.directory = directory
+        self._grids: Dict[str, Tuple[float, DensityGrid]] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, category: str) -> str:
+        return os.path.join(self.directory, f"{normalize_category(category)}.json")
+
+    def checkpoint_path_for(self, category: str) -> str:
+        # Kept in a subdirectory so an unfinished sweep never looks like a grid
+        return os.path.join(self.directory, self.CHECKPOINT_DIR, f"{normalize_category(category)}.json")
+
+    def get(self, category: str) -> Optional[DensityGrid]:
+        path = self.path_for(category)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._grids.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            grid = DensityGrid.load(path)
+            self._grids[path] = (mtime, grid)
+            return grid
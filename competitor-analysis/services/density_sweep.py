@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.density_grid import DensityGrid
+from services.places_service import PlacesService
+from utils.geo import haversine_m
+from utils.resilience import DEFAULT_POLICIES, ResilienceRegistry
+
+logger = logging.getLogger(__name__)
+
+class SweepBudget:
+    """
+    Request and cost budget for a sweep. Each tile reserves the worst case
+    (every page of a full search) before it starts; when it finishes the
+    reservation is released and the HTTP requests actually sent are charged,
+    so concurrent tiles can never overspend.
+    """
+
+    def __init__(
+        self,
+        max_requests: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        cost_per_request: float = 0.032,
+        used_requests: int = 0
+    ):
+        self.cost_per_request = cost_per_request
+        limits = [max_requests] if max_requests is not None else []
+        if max_cost is not None:
+            limits.append(int(max_cost / cost_per_request))
+        self.max_requests = min(limits) if limits else None
+        self.used_requests = used_requests
+        self._reserved = 0
+
+    def reserve(self, requests: int) -> bool:
+        if self.max_requests is not None and self.used_requests + self._reserved + requests > self.max_requests:
+            return False
+        self._reserved += requests
+        return True
+
+    def settle(self, reserved: int, used: int) -> None:
+        self._reserved -= reserved
+        self.used_requests += used
+
+    @property
+    def cost(self) -> float:
+        return self.used_requests * self.cost_per_request
+
+def sweep_resilience() -> ResilienceRegistry:
+    """Resilience settings for a sweep's PlacesService: one HTTP request per page, no retries or hedges."""
+    return ResilienceRegistry({
+        "google_places": replace(DEFAULT_POLICIES["google_places"], max_retries=0, hedge=False)
+    })
+
+class DensitySweep:
+    """
+    Tiles a bounding box into cells and runs a Places search restricted to
+    each cell, a few at a time. A cell whose search comes back full (Places
+    returns at most 60 results) is split into four and searched again, up to
+    `max_depth` times. Places are deduplicated by place_id and binned into
+    the output grid by their own location, so overlapping searches never
+    count a place twice.
+
+    Progress is checkpointed to a JSON file; running the same sweep again
+    resumes from the unfinished cells.
+
+    The budget charges every request the PlacesService really sent. A tile
+    reserves one request per page, which is only a true worst case when the
+    service neither retries nor hedges (see `sweep_resilience`).
+    """
+
+    def __init__(
+        self,
+        places_service: PlacesService,
+        category: str,
+        bbox: Tuple[float, float, float, float],
+        cell_size_m: float = 1000,
+        concurrency: int = 4,
+        max_depth: int = 2,
+        budget: Optional[SweepBudget] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_every: int = 10
+    ):
+        self.places_service = places_service
+        self.category = category
+        self.grid = DensityGrid(category, bbox, cell_size_m)
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max_depth
+        self.budget = budget or SweepBudget()
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.pages_per_search = math.ceil(places_service.max_total_results / PlacesService.PAGE_SIZE)
+        self._requests_charged = places_service.requests_sent
+
+        self.places: Dict[str, Tuple[float, float]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.done: set = set()
+        self.saturated: set = set()
+        self.failed = 0
+        self._since_checkpoint = 0
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {
+            "category": self.category,
+            "bbox": list(self.grid.bbox),
+            "cell_size_m": self.grid.cell_size_m,
+            "max_depth": self.max_depth
+        }
+
+    async def run(self) -> DensityGrid:
+        if not self._load_checkpoint():
+            for row in range(self.grid.rows):
+                for col in range(self.grid.cols):
+                    self._add_tile(f"{row},{col}", self.grid.cell_bounds(row, col), 0)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for tile in self.pending.values():
+            queue.put_nowait(tile)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._save_checkpoint()
+
+        for lat, lng in self.places.values():
+            self.grid.add(lat, lng)
+        self.grid.created_at = time.time()
+        self.grid.stats = self.stats()
+        return self.grid
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "unique_places": len(self.places),
+            "tiles_done": len(self.done),
+            "tiles_pending": len(self.pending),
+            "tiles_saturated": len(self.saturated),
+            "tiles_failed": self.failed,
+            "requests_used": self.budget.used_requests,
+            "estimated_cost": round(self.budget.cost, 4),
+            "complete": not self.pending
+        }
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            tile = await queue.get()
+            try:
+                reserved = self.pages_per_search
+                if not self.budget.reserve(reserved):
+                    # Out of budget: leave the tile pending for a later run
+                    continue
+                try:
+                    results = await self._search_tile(tile)
+                except Exception as e:
+                    logger.warning("Density sweep tile %s failed: %s", tile["key"], e)
+                    self.failed += 1
+                    continue
+                finally:
+                    self.budget.settle(reserved, self._uncharged_requests())
+
+                for child in self._record_results(tile, results):
+                    queue.put_nowait(child)
+                self._since_checkpoint += 1
+                if self._since_checkpoint >= self.checkpoint_every:
+                    self._save_checkpoint()
+            finally:
+                queue.task_done()
+
+    def _uncharged_requests(self) -> int:
+        # Requests sent since the last charge, by any tile; a tile still running
+        # is briefly counted both here and in its reservation, which only errs
+        # on the safe side
+        sent = self.places_service.requests_sent
+        uncharged, self._requests_charged = sent - self._requests_charged, sent
+        return uncharged
+
+    async def _search_tile(self, tile: Dict[str, Any]) -> List[Dict]:
+        min_lat, min_lng, max_lat, max_lng = tile["bounds"]
+        return await self.places_service._search_places(
+            query=self.category,
+            max_results=self.places_service.max_total_results,
+            min_rating=0.0,
+            open_now=False,
+            profile="count",
+            category=self.category,
+            location_restriction={"rectangle": {
+                "low": {"latitude": min_lat, "longitude": min_lng},
+                "high": {"latitude": max_lat, "longitude": max_lng}
+            }}
+        )
+
+    def _record_results(self, tile: Dict[str, Any], results: List[Dict]) -> List[Dict[str, Any]]:
+        for place in results:
+            location = place.get("location") or {}
+            if place.get("id") and "latitude" in location and "longitude" in location:
+                self.places[place["id"]] = (location["latitude"], location["longitude"])
+        del self.pending[tile["key"]]
+        self.done.add(tile["key"])
+
+        if len(results) < self.places_service.max_total_results:
+            self._record_coverage(tile)
+            return []
+        if tile["depth"] >= self.max_depth:
+            # Still full at the finest level: this cell's count is a lower bound
+            self.saturated.add(tile["key"])
+            return []
+        return self._split(tile)
+
+    def _split(self, tile: Dict[str, Any]) -> List[Dict[str, Any]]:
+        min_lat, min_lng, max_lat, max_lng = tile["bounds"]
+        mid_lat, mid_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+        quadrants = [
+            (min_lat, min_lng, mid_lat, mid_lng), (min_lat, mid_lng, mid_lat, max_lng),
+            (mid_lat, min_lng, max_lat, mid_lng), (mid_lat, mid_lng, max_lat, max_lng)
+        ]
+        return [
+            self._add_tile(f"{tile['key']}/{index}", bounds, tile["depth"] + 1)
+            for index, bounds in enumerate(quadrants)
+        ]
+
+    def _add_tile(self, key: str, bounds: Tuple[float, float, float, float], depth: int) -> Dict[str, Any]:
+        tile = {"key": key, "bounds": list(bounds), "depth": depth}
+        self.pending[key] = tile
+        return tile
+
+    def _record_coverage(self, tile: Dict[str, Any]) -> None:
+        """Let the place store answer counts inside a completely searched tile."""
+        store = self.places_service.place_store
+        if not store:
+            return
+        min_lat, min_lng, max_lat, max_lng = tile["bounds"]
+        center_lat, center_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+        radius = min(
+            haversine_m(center_lat, center_lng, min_lat, center_lng),
+            haversine_m(center_lat, center_lng, center_lat, min_lng)
+        )
+        store.record_coverage(self.category, center_lat, center_lng, radius)
+
+    def _load_checkpoint(self) -> bool:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path) as f:
+            state = json.load(f)
+        if state.get("config") != self.config:
+            logger.warning("Ignoring checkpoint %s written for a different sweep", self.checkpoint_path)
+            return False
+        self.pending = {tile["key"]: tile for tile in state["pending"]}
+        self.done = set(state["done"])
+        self.saturated = set(state["saturated"])
+        self.places = {place_id: tuple(location) for place_id, location in state["places"].items()}
+        self.budget.used_requests += state["requests_used"]
+        logger.info("Resuming density sweep: %d tiles done, %d pending", len(self.done), len(self.pending))
+        return True
+
+    def _save_checkpoint(self) -> None:
+        self._since_checkpoint = 0
+        if not self.checkpoint_path:
+            return
+        state = {
+            "config": self.config,
+            "pending": list(self.pending.values()),
+            "done": sorted(self.done),
+            "saturated": sorted(self.saturated),
+            "places": self.places,
+            "requests_used": self.budget.used_requests
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    pass
+
+class Job:
+    def __init__(self, key: str, request: BaseModel, priority: int):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.request = request
+        self.priority = priority
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+class JobQueue:
+    """
+    In-process background job queue for slow analyses.
+
+    Jobs wait in a bounded priority queue (lower `priority` runs first, FIFO
+    within a priority) and are executed by a fixed pool of worker tasks.
+    Submitting a request identical to one that is still queued or running
+    returns the existing job instead of doing the work twice; if that job is
+    still queued and the new submission has a higher priority (lower number),
+    the job is moved up to it. Finished jobs are kept for `result_ttl_seconds`
+    so clients can poll for them.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[BaseModel], Awaitable[Any]],
+        workers: int = 2,
+        max_queue: int = 100,
+        result_ttl_seconds: float = 3600
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_key: Dict[str, Job] = {}
+        self._sequence = itertools.count()
+        self._worker_tasks = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, request: BaseModel, priority: int = 5) -> Job:
+        """Queue `request`, or return the identical job that is already pending."""
+        self._purge_expired()
+        key = self._request_key(request)
+        existing = self._active_by_key.get(key)
+        if existing is not None:
+            if existing.status == "queued" and priority < existing.priority:
+                self._raise_priority(existing, priority)
+            return existing
+
+        job = Job(key, request, priority)
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full, try again later")
+        self._jobs[job.id] = job
+        self._active_by_key[key] = job
+        return job
+
+    def _raise_priority(self, job: Job, priority: int) -> None:
+        # PriorityQueue cannot reorder in place: queue the job again at the new
+        # priority and let the worker skip the entry it leaves behind
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            return
+        job.priority = priority
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to `timeout` seconds for `job` to finish."""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "queued": statuses.get("queued", 0),
+            "workers": self.workers,
+            "jobs": statuses
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _, job = await self._queue.get()
+            if job.status != "queued" or priority != job.priority:
+                # Entry left behind when the job's priority was raised
+                self._queue.task_done()
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await self.handler(job.request)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Job cancelled during shutdown"
+                raise
+            except Exception as e:
+                logger.exception("Background job %s failed", job.id)
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._active_by_key.pop(job.key, None)
+                job.done.set()
+                self._queue.task_done()
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _request_key(request: BaseModel) -> str:
+        return hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
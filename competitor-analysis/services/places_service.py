@@ -1,6 +1,7 @@
-import httpx
 import asyncio
-from typing import List, Dict, Any
+import json
+import httpx
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
 from models.competitor_models import (
     CompetitorAnalysisRequest, 
@@ -13,13 +14,40 @@ from models.competitor_models import (
 )
 from services.tavily_service import TavilyService
 from services.analysis_service import AnalysisService
+from utils.geo import haversine_m
+from utils.http_clients import HttpClientRegistry, upstream_url
+from utils.places_cache import PlacesSearchCache
+from utils.places_fields import field_mask, profile_fields
+from utils.place_store import PlaceStore, bounding_box
+from utils.resilience import ResilienceRegistry
 
 class PlacesService:
-    def __init__(self, api_key: str, tavily_service: TavilyService = None, analysis_service: AnalysisService = None):
+    # Places Text Search returns at most 20 results per page and 60 in total
+    PAGE_SIZE = 20
+    MAX_TOTAL_RESULTS = 60
+    
+    def __init__(
+        self,
+        api_key: str,
+        tavily_service: TavilyService = None,
+        analysis_service: AnalysisService = None,
+        http_clients: Optional[HttpClientRegistry] = None,
+        places_cache: Optional[PlacesSearchCache] = None,
+        max_total_results: int = MAX_TOTAL_RESULTS,
+        place_store: Optional[PlaceStore] = None,
+        resilience: Optional[ResilienceRegistry] = None
+    ):
         self.api_key = api_key
-        self.base_url = "https://places.googleapis.com/v1/places:searchText"
+        self.base_url = upstream_url("google_places", "/v1/places:searchText")
         self.tavily_service = tavily_service
         self.analysis_service = analysis_service
+        self.http_clients = http_clients or HttpClientRegistry()
+        self.places_cache = places_cache
+        self.max_total_results = min(max_total_results, self.MAX_TOTAL_RESULTS)
+        self.place_store = place_store
+        self.resilience = resilience or ResilienceRegistry()
+        # HTTP requests actually sent to Places, including retries and hedges
+        self.requests_sent = 0
         
     async def analyze_competitors(self, request: CompetitorAnalysisRequest) -> CompetitorAnalysisResponse:
         search_query = f"{request.business_type} in {request.location}"
@@ -28,73 +56,279 @@ class PlacesService:
             query=search_query,
             max_results=request.max_results,
             min_rating=request.min_rating,
-            open_now=request.open_now
+            open_now=request.open_now,
+            category=request.business_type
         )
         
         competitors = self._parse_competitors(places_data)
         
         # Phase 2: Enhanced analysis if enabled
-        if request.enable_deep_analysis and self.tavily_service and self.analysis_service:
+        if self._deep_analysis_enabled(request):
             competitors = await self._enhance_competitors_with_analysis(
-                competitors, request.business_type, request.location
+                competitors, request.business_type, request.location, request.analysis_mode
             )
         
         market_insights = self._generate_market_insights(competitors)
         
-        query_info = QueryInfo(
+        return CompetitorAnalysisResponse(
+            query_info=self._build_query_info(request, search_query, len(competitors)),
+            competitors=competitors,
+            market_insights=market_insights
+        )
+    
+    async def stream_competitor_analysis(self, request: CompetitorAnalysisRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of analyze_competitors. Yields events as they become
+        ready: "query_info" once the Places search returns, one "competitor"
+        event per competitor as soon as its own enrichment finishes (in
+        completion order, with its original "index"), and finally
+        "market_insights".
+        """
+        search_query = f"{request.business_type} in {request.location}"
+        
+        places_data = await self._search_places(
+            query=search_query,
+            max_results=request.max_results,
+            min_rating=request.min_rating,
+            open_now=request.open_now,
+            category=request.business_type
+        )
+        
+        competitors = self._parse_competitors(places_data)
+        yield {"event": "query_info", "data": self._build_query_info(request, search_query, len(competitors))}
+        
+        if self._deep_analysis_enabled(request) and request.analysis_mode == "per_competitor":
+            async for index, competitor in self._iter_enriched_competitors(
+                competitors, request.business_type, request.location
+            ):
+                yield {"event": "competitor", "index": index, "data": competitor}
+        else:
+            # Batched analyses only complete as a whole, so emit them together
+            if self._deep_analysis_enabled(request):
+                competitors = await self._enhance_competitors_with_analysis(
+                    competitors, request.business_type, request.location, request.analysis_mode
+                )
+            for index, competitor in enumerate(competitors):
+                yield {"event": "competitor", "index": index, "data": competitor}
+        
+        yield {"event": "market_insights", "data": self._generate_market_insights(competitors)}
+    
+    def _deep_analysis_enabled(self, request: CompetitorAnalysisRequest) -> bool:
+        return bool(request.enable_deep_analysis and self.tavily_service and self.analysis_service)
+    
+    def _build_query_info(self, request: CompetitorAnalysisRequest, search_query: str, total_results: int) -> QueryInfo:
+        return QueryInfo(
             business_type=request.business_type,
             location=request.location,
             search_query=search_query,
             radius_meters=request.radius_meters,
             timestamp=datetime.now(),
-            total_results=len(competitors)
+            total_results=total_results
         )
+    
+    async def _search_places(
+        self,
+        query: str,
+        max_results: int,
+        min_rating: float,
+        open_now: bool,
+        profile: str = "full",
+        category: str = None,
+        location_restriction: Dict[str, Any] = None,
+        coverage_circle: Tuple[float, float, float] = None
+    ) -> List[Dict]:
+        max_results = min(max_results, self.max_total_results)
         
-        return CompetitorAnalysisResponse(
-            query_info=query_info,
-            competitors=competitors,
-            market_insights=market_insights
+        async def fetch() -> List[Dict]:
+            places = []
+            async for page in self.iter_places(
+                query, max_results, min_rating, open_now, profile, location_restriction
+            ):
+                places.extend(page)
+            # Every live result also feeds the local spatial store
+            if self.place_store:
+                self.place_store.observe(places, category)
+                # Coverage is stamped here, on the live fetch, so a stale cached
+                # answer never makes old data look freshly searched. Only an
+                # unfiltered, untruncated search is a complete picture of the area
+                if coverage_circle and not min_rating and len(places) < max_results:
+                    self.place_store.record_coverage(category, *coverage_circle)
+            return places
+        
+        if not self.places_cache:
+            return await fetch()
+        
+        cache_query = query
+        if location_restriction:
+            cache_query = f"{query} @ {json.dumps(location_restriction, sort_keys=True)}"
+        cache_key = PlacesSearchCache.make_key(
+            cache_query, max_results, min_rating, open_now, field_mask(profile, paginated=True)
+        )
+        return await self.places_cache.get_or_fetch(cache_key, fetch)
+    
+    async def count_in_area(
+        self,
+        category: str,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        min_rating: float = 0.0,
+        max_age_seconds: float = None
+    ) -> Tuple[int, str]:
+        """
+        Count places of `category` within a circle. Answered from the local
+        place store when a fresh, complete search already covers the circle;
+        otherwise a search restricted to the circle's bounding box is made.
+        A live (not cached) search is recorded as coverage when it was
+        neither rating-filtered nor truncated.
+        
+        Returns (count, source) where source is "local_store" or "places_api".
+        """
+        if self.place_store:
+            local_count = self.place_store.count_if_covered(
+                category, latitude, longitude, radius_meters, min_rating, max_age_seconds
+            )
+            if local_count is not None:
+                return local_count, "local_store"
+        
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_meters)
+        restriction = {"rectangle": {
+            "low": {"latitude": min_lat, "longitude": min_lng},
+            "high": {"latitude": max_lat, "longitude": max_lng}
+        }}
+        places_data = await self._search_places(
+            query=category,
+            max_results=self.max_total_results,
+            min_rating=min_rating,
+            open_now=False,
+            profile="count",
+            category=category,
+            location_restriction=restriction,
+            coverage_circle=(latitude, longitude, radius_meters)
         )
+        
+        in_circle = [
+            place for place in places_data
+            if "location" in place and haversine_m(
+                latitude, longitude, place["location"]["latitude"], place["location"]["longitude"]
+            ) <= radius_meters
+        ]
+        return len(in_circle), "places_api"
     
-    async def _search_places(self, query: str, max_results: int, min_rating: float, open_now: bool) -> List[Dict]:
+    async def iter_places(
+        self,
+        query: str,
+        max_results: int,
+        min_rating: float,
+        open_now: bool,
+        profile: str = "full",
+        location_restriction: Dict[str, Any] = None
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yield pages of Places text-search results, following nextPageToken
+        until max_results places have been returned or no pages remain.
+        
+        The next page is requested as soon as its token arrives, so it is
+        already in flight while the caller processes the current page.
+        Only the fields in the named field-mask profile are requested.
+        """
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.priceLevel,places.businessStatus,places.websiteUri,places.nationalPhoneNumber,places.regularOpeningHours,places.reviews,places.id"
+            "X-Goog-FieldMask": field_mask(profile, paginated=True)
         }
         
+        remaining = min(max_results, self.max_total_results)
+        next_page = None
+        if remaining > 0:
+            next_page = asyncio.create_task(
+                self._fetch_page(headers, query, remaining, min_rating, open_now, None, location_restriction)
+            )
+        
+        try:
+            while next_page is not None:
+                data = await next_page
+                next_page = None
+                places = data.get("places", [])[:remaining]
+                remaining -= len(places)
+                
+                page_token = data.get("nextPageToken")
+                if page_token and places and remaining > 0:
+                    next_page = asyncio.create_task(
+                        self._fetch_page(
+                            headers, query, remaining, min_rating, open_now, page_token, location_restriction
+                        )
+                    )
+                
+                if places:
+                    yield places
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+    
+    async def _fetch_page(
+        self,
+        headers: Dict[str, str],
+        query: str,
+        remaining: int,
+        min_rating: float,
+        open_now: bool,
+        page_token: str = None,
+        location_restriction: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         payload = {
             "textQuery": query,
-            "pageSize": min(max_results, 20),
+            "pageSize": min(remaining, self.PAGE_SIZE),
             "minRating": min_rating,
             "openNow": open_now
         }
+        if page_token:
+            payload["pageToken"] = page_token
+        if location_restriction:
+            payload["locationRestriction"] = location_restriction
         
-        async with httpx.AsyncClient() as client:
+        client = self.http_clients.get("google_places")
+        
+        async def send() -> httpx.Response:
+            self.requests_sent += 1
             response = await client.post(self.base_url, headers=headers, json=payload)
             response.raise_for_status()
-            data = response.json()
-            
-            return data.get("places", [])
+            return response
+        
+        # Searches are read-only, so they may be retried and hedged
+        response = await self.resilience.get("google_places").call(send)
+        return response.json()
     
-    def _parse_competitors(self, places_data: List[Dict]) -> List[Competitor]:
+    def _parse_competitors(self, places_data: List[Dict], profile: str = "full") -> List[Competitor]:
+        # Only parse the fields the profile asked for; everything else keeps
+        # the model default instead of going through the parsers
+        fields = profile_fields(profile)
         competitors = []
         
         for place in places_data:
-            competitor = Competitor(
-                name=place.get("displayName", {}).get("text", "Unknown"),
-                address=place.get("formattedAddress", ""),
-                rating=place.get("rating"),
-                review_count=place.get("userRatingCount"),
-                price_level=self._parse_price_level(place.get("priceLevel")),
-                phone=place.get("nationalPhoneNumber"),
-                website=place.get("websiteUri"),
-                business_status=place.get("businessStatus"),
-                opening_hours=self._parse_opening_hours(place.get("regularOpeningHours")),
-                top_reviews=self._parse_reviews(place.get("reviews", [])),
-                place_id=place.get("id", "")
-            )
-            competitors.append(competitor)
+            values = {
+                "name": place.get("displayName", {}).get("text", "Unknown"),
+                "address": place.get("formattedAddress", ""),
+                "place_id": place.get("id", "")
+            }
+            if "rating" in fields:
+                values["rating"] = place.get("rating")
+            if "userRatingCount" in fields:
+                values["review_count"] = place.get("userRatingCount")
+            if "priceLevel" in fields:
+                values["price_level"] = self._parse_price_level(place.get("priceLevel"))
+            if "nationalPhoneNumber" in fields:
+                values["phone"] = place.get("nationalPhoneNumber")
+            if "websiteUri" in fields:
+                values["website"] = place.get("websiteUri")
+            if "businessStatus" in fields:
+                values["business_status"] = place.get("businessStatus")
+            if "regularOpeningHours" in fields:
+                values["opening_hours"] = self._parse_opening_hours(place.get("regularOpeningHours"))
+            if "reviews" in fields:
+                values["top_reviews"] = self._parse_reviews(place.get("reviews", []))
+            
+            competitors.append(Competitor(**values))
         
         return competitors
     
@@ -177,20 +411,53 @@ class PlacesService:
         self, 
         competitors: List[Competitor], 
         business_type: str, 
-        location: str
+        location: str,
+        analysis_mode: str = "per_competitor"
     ) -> List[Competitor]:
-        # Prepare competitor data for Tavily searches
-        competitor_data = [
-            {"name": c.name, "location": location} 
-            for c in competitors
-        ]
+        if analysis_mode == "batched":
+            # Research everything first, then pack the LLM analyses into few requests
+            tavily_responses = await self.tavily_service.batch_search_competitors(
+                [{"name": c.name, "location": location} for c in competitors]
+            )
+            return await self.analysis_service.batch_analyze_competitors_packed(
+                competitors, tavily_responses, business_type, location
+            )
         
-        # Batch search competitors using Tavily
-        tavily_responses = await self.tavily_service.batch_search_competitors(competitor_data)
+        enhanced_competitors = list(competitors)
         
-        # Generate LLM analysis for each competitor
-        enhanced_competitors = await self.analysis_service.batch_analyze_competitors(
-            competitors, tavily_responses, business_type, location
-        )
+        async for index, competitor in self._iter_enriched_competitors(competitors, business_type, location):
+            enhanced_competitors[index] = competitor
+        
+        return enhanced_competitors
+    
+    async def _iter_enriched_competitors(
+        self,
+        competitors: List[Competitor],
+        business_type: str,
+        location: str
+    ) -> AsyncIterator[Tuple[int, Competitor]]:
+        """
+        Run web research then LLM analysis for each competitor as an
+        independent pipeline, yielding (index, competitor) as each finishes.
+        A competitor's analysis starts as soon as its own research arrives
+        instead of waiting for the whole Tavily batch.
+        """
+        research_slots = asyncio.Semaphore(self.tavily_service.concurrency)
+        analysis_slots = asyncio.Semaphore(self.analysis_service.concurrency)
+        
+        async def enrich(index: int, competitor: Competitor) -> Tuple[int, Competitor]:
+            async with research_slots:
+                tavily_data = await self.tavily_service.search_or_error(competitor.name, location)
+            async with analysis_slots:
+                competitor = await self.analysis_service.analyze_competitor(
+                    competitor, tavily_data, business_type, location
+                )
+            return index, competitor
         
-        return enhanced_competitors
\ No newline at end of file
+        tasks = [asyncio.create_task(enrich(i, c)) for i, c in enumerate(competitors)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -1,14 +1,36 @@
-import httpx
 import asyncio
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Optional
 from models.competitor_models import TavilyResponse, TavilySearchResult
+from utils.http_clients import HttpClientRegistry, upstream_url
+from utils.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from utils.resilience import ResilienceRegistry
+
+logger = logging.getLogger(__name__)
 
 class TavilyService:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        http_clients: Optional[HttpClientRegistry] = None,
+        concurrency: int = 3,
+        max_retries: int = 3,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        resilience: Optional[ResilienceRegistry] = None
+    ):
         self.api_key = api_key
-        self.base_url = "https://api.tavily.com/search"
+        self.base_url = upstream_url("tavily", "/search")
+        self.http_clients = http_clients or HttpClientRegistry()
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.resilience = resilience or ResilienceRegistry()
         
     async def search_competitor(self, competitor_name: str, location: str) -> TavilyResponse:
+        await self.rate_limiter.acquire()
+        return await self._search(competitor_name, location)
+
+    async def _search(self, competitor_name: str, location: str) -> TavilyResponse:
         query = f"{competitor_name} {location} reviews reputation business"
         
         headers = {
@@ -24,12 +46,36 @@ class TavilyService:
             "topic": "general"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.base_url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            return self._parse_response(data)
+        client = self.http_clients.get("tavily")
+        response = await client.post(self.base_url, headers=headers, json=payload)
+        if response.status_code == 429:
+            self.rate_limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+        response.raise_for_status()
+        self.rate_limiter.on_success()
+        data = response.json()
+        
+        return self._parse_response(data)
+    
+    async def search_with_retry(self, competitor_name: str, location: str) -> TavilyResponse:
+        """
+        Search for a competitor, retrying throttled, 5xx and network failures
+        with jittered exponential backoff behind the Tavily circuit breaker.
+        The rate limiter wait (including Retry-After pauses) happens before
+        each attempt, outside its timeout.
+        """
+        return await self.resilience.get("tavily").call(
+            lambda: self._search(competitor_name, location),
+            max_retries=self.max_retries,
+            before_attempt=self.rate_limiter.acquire
+        )
+    
+    async def search_or_error(self, competitor_name: str, location: str) -> TavilyResponse:
+        """Search with retries; a final failure is returned as a response with `error` set."""
+        try:
+            return await self.search_with_retry(competitor_name, location)
+        except Exception as e:
+            logger.warning("Tavily search failed for %s: %s", competitor_name, e)
+            return TavilyResponse(query="", results=[], error=str(e) or type(e).__name__)
     
     def _parse_response(self, data: Dict[str, Any]) -> TavilyResponse:
         results = []
@@ -50,32 +96,13 @@ class TavilyService:
         )
     
     async def batch_search_competitors(self, competitors: List[Dict[str, str]]) -> List[TavilyResponse]:
-        tasks = []
-        
-        for competitor in competitors:
-            task = self.search_competitor(
-                competitor["name"], 
-                competitor["location"]
-            )
-            tasks.append(task)
-        
-        # Execute searches concurrently with rate limiting
-        responses = []
-        batch_size = 3  # Limit concurrent requests
+        # Sliding window: a new search starts as soon as any running one
+        # finishes, and the rate limiter paces requests across all of them
+        semaphore = asyncio.Semaphore(self.concurrency)
         
-        for i in range(0, len(tasks), batch_size):
-            batch = tasks[i:i + batch_size]
-            batch_responses = await asyncio.gather(*batch, return_exceptions=True)
-            
-            for response in batch_responses:
-                if isinstance(response, Exception):
-                    # Return empty response on error
-                    responses.append(TavilyResponse(query="", results=[]))
-                else:
-                    responses.append(response)
-            
-            # Rate limiting pause between batches
-            if i + batch_size < len(tasks):
-                await asyncio.sleep(1)
+        async def search(competitor: Dict[str, str]) -> TavilyResponse:
+            async with semaphore:
+                return await self.search_or_error(competitor["name"], competitor["location"])
         
-        return responses
\ No newline at end of file
+        # gather preserves input order
+        return await asyncio.gather(*(search(competitor) for competitor in competitors))
@@ -0,0 +1,278 @@
+"""
+Batch scoring of candidate sites for overnight screening runs.
+
+Sites (category plus address or coordinates) are read from CSV or JSONL and
+scored on a worker pool with a bounded number of sites in flight. Results are
+streamed to JSONL, CSV or Parquet as they complete, in completion order. A
+checkpoint file records every site whose result is durably written, so an
+interrupted run resumes where it stopped. Delivery is at-least-once: a crash
+between writing a row and checkpointing it can repeat that one row.
+
+Parquet output needs the optional ``pyarrow`` package. Rows are written in
+row groups, and a resumed Parquet run writes a new ``.partN.parquet`` file
+next to the first one instead of appending.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+from engine.location_validator import validate_location
+from engine.metric_registry import DEFAULT_TIMEOUT_SECONDS, default_registry
+from engine.metric_selector import MetricSelector
+from engine.scorer import Scorer
+
+logger = logging.getLogger(__name__)
+
+LOCATION_COLUMNS = ("location", "address", "coordinates")
+CSV_COLUMNS = ("id", "category", "location", "status", "score", "metrics", "errors", "elapsed_ms")
+
+
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+def read_sites(path: str) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "category", "location"} for each site in a CSV or JSONL file."""
+    is_jsonl = path.endswith((".jsonl", ".ndjson"))
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = (json.loads(line) for line in f if line.strip()) if is_jsonl else csv.DictReader(f)
+        for number, row in enumerate(rows, start=1):
+            row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+            yield {
+                "id": str(row.get("id") or row.get("site_id") or f"row-{number}"),
+                "category": str(row.get("category") or "").strip(),
+                "location": _location_of(row),
+            }
+
+
+def _location_of(row: Dict[str, Any]) -> str:
+    for column in LOCATION_COLUMNS:
+        if row.get(column) not in (None, ""):
+            return str(row[column]).strip()
+    lat = row.get("lat", row.get("latitude"))
+    lng = row.get("lng", row.get("lon", row.get("longitude")))
+    if lat not in (None, "") and lng not in (None, ""):
+        return f"{lat},{lng}"
+    return ""
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+def evaluate_site(site: Dict[str, str], timeout: Optional[float] = DEFAULT_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """Score one site; failures are reported in the record rather than raised."""
+    started = time.perf_counter()
+    record: Dict[str, Any] = dict(site, status="ok", score=None, metrics={}, errors={})
+    weights = MetricSelector.get_metrics_for_category(site["category"]) if site["category"] else {}
+    if not weights:
+        record.update(status="error", errors={"category": f"unknown category {site['category']!r}"})
+    elif not validate_location(site["location"]):
+        record.update(status="error", errors={"location": "invalid location"})
+    else:
+        results = default_registry.evaluate_sync(weights, site["location"], timeout=timeout)
+        raw_scores = []
+        for metric, weight in weights.items():
+            result = results[metric]
+            if result.ok:
+                raw_scores.append((metric, result.value, weight))
+                record["metrics"][metric] = result.value
+            else:
+                record["errors"][metric] = result.error
+        if raw_scores:
+            record["score"] = round(Scorer.score(raw_scores)[0], 4)
+            if record["errors"]:
+                record["status"] = "partial"
+        else:
+            record["status"] = "error"
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+class JsonlWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> List[str]:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        return [record["id"]]
+
+    def close(self) -> List[str]:
+        self._file.close()
+        return []
+
+
+class CsvWriter:
+    def __init__(self, path: str):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> List[str]:
+        row = dict(record, metrics=json.dumps(record["metrics"]), errors=json.dumps(record["errors"]))
+        self._writer.writerow({column: row.get(column) for column in CSV_COLUMNS})
+        self._file.flush()
+        return [record["id"]]
+
+    def close(self) -> List[str]:
+        self._file.close()
+        return []
+
+
+class ParquetWriter:
+    """Buffers rows into row groups; ids become durable only once their group is written."""
+
+    def __init__(self, path: str, row_group_size: int = 1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from error
+        self._pa, self._pq = pa, pq
+        self.path = self._free_path(path)
+        self.row_group_size = row_group_size
+        self._schema = pa.schema([
+            ("id", pa.string()), ("category", pa.string()), ("location", pa.string()),
+            ("status", pa.string()), ("score", pa.float64()), ("metrics", pa.string()),
+            ("errors", pa.string()), ("elapsed_ms", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]) -> List[str]:
+        self._rows.append(dict(record, metrics=json.dumps(record["metrics"]), errors=json.dumps(record["errors"])))
+        return self._flush() if len(self._rows) >= self.row_group_size else []
+
+    def close(self) -> List[str]:
+        ids = self._flush()
+        self._writer.close()
+        return ids
+
+    def _flush(self) -> List[str]:
+        if not self._rows:
+            return []
+        table = self._pa.Table.from_pylist(
+            [{column: row.get(column) for column in CSV_COLUMNS} for row in self._rows], schema=self._schema
+        )
+        self._writer.write_table(table)
+        ids = [row["id"] for row in self._rows]
+        self._rows = []
+        return ids
+
+    @staticmethod
+    def _free_path(path: str) -> str:
+        if not os.path.exists(path):
+            return path
+        stem, extension = os.path.splitext(path)
+        part = 2
+        while os.path.exists(f"{stem}.part{part}{extension}"):
+            part += 1
+        return f"{stem}.part{part}{extension}"
+
+
+def open_writer(path: str, output_format: Optional[str] = None):
+    output_format = output_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if output_format in ("jsonl", "ndjson", "json"):
+        return JsonlWriter(path)
+    if output_format == "csv":
+        return CsvWriter(path)
+    if output_format == "parquet":
+        return ParquetWriter(path)
+    raise ValueError(f"Unsupported output format {output_format!r}; use jsonl, csv or parquet")
+
+
+class Checkpoint:
+    """Append-only file of site ids whose results are durably written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def mark(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if ids:
+            self._file.write("".join(f"{site_id}\n" for site_id in ids))
+            self._file.flush()
+            self.done.update(ids)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+def run_batch(
+    input_path: str,
+    output_path: str,
+    output_format: Optional[str] = None,
+    workers: int = 4,
+    max_in_flight: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    timeout: Optional[float] = DEFAULT_TIMEOUT_SECONDS,
+    progress_every: int = 100,
+) -> Dict[str, Any]:
+    """Score every site in ``input_path`` not already checkpointed; returns the run summary."""
+    max_in_flight = max_in_flight or workers * 2
+    writer = open_writer(output_path, output_format)
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint")
+    counts = {"ok": 0, "partial": 0, "error": 0, "skipped": 0}
+    latencies: List[float] = []
+    started = time.perf_counter()
+
+    def record_done(record: Dict[str, Any]) -> None:
+        counts[record["status"]] += 1
+        latencies.append(record["elapsed_ms"])
+        checkpoint.mark(writer.write(record))
+        completed = len(latencies)
+        if progress_every and completed % progress_every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"{completed} sites scored, {completed / elapsed:.1f} sites/s", file=sys.stderr)
+
+    pool = concurrent.futures.ThreadPoolExecutor(max(1, workers), thread_name_prefix="site")
+    in_flight: Set[concurrent.futures.Future] = set()
+    try:
+        for site in read_sites(input_path):
+            if site["id"] in checkpoint.done:
+                counts["skipped"] += 1
+                continue
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    record_done(future.result())
+            in_flight.add(pool.submit(evaluate_site, site, timeout))
+        for future in concurrent.futures.as_completed(in_flight):
+            record_done(future.result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        checkpoint.mark(writer.close())
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    scored = len(latencies)
+    return {
+        "scored": scored,
+        **counts,
+        "elapsed_s": round(elapsed, 2),
+        "sites_per_s": round(scored / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 1) if latencies else None,
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+        "output": getattr(writer, "path", output_path),
+    }
@@ -0,0 +1,132 @@
+"""
+Request-scoped cache of the upstream data fetched for one scored location.
+
+Several metrics need the same inputs: ``TrafficMetric`` and
+``SchoolBusinessMetric`` run the same school/business searches, and parking
+and proximity both start from the site's coordinates. The engine creates one
+``LocationContext`` per evaluated location and passes it to every metric's
+``calculate``. The context memoizes the geocode result and the proximity
+search results per query. Metrics run concurrently, so a fetch already in
+flight for another metric is awaited instead of repeated. Each piece of
+upstream data is fetched at most once per scored location. A failed fetch is
+memoized as well, so the failure is not retried by every metric.
+
+Usage Example:
+    >>> context = LocationContext("45.4215,-75.6972")
+    >>> context.coordinates()
+    (45.4215, -75.6972)
+    >>> TrafficMetric(context.location).calculate(context)
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from engine.location_validator import parse_coordinates
+from utils.resilience import DeadlineExceeded, blocking_timeout, remaining_time
+
+
+def _default_geocoder(address: str) -> Optional[Tuple[float, float]]:
+    from utils.address_validator import AddressValidator
+    validator = AddressValidator()
+    remaining = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceeded(f"No time left to geocode {address!r}")
+        validator.timeout = min(validator.timeout, remaining)
+    return validator.get_coordinates(address)
+
+
+def _default_proximity_lookup(queries, return_exceptions=False):
+    # Imported lazily: the proximity API module needs GOOGLE_PLACES_API_KEY at import time
+    from metrics.traffic.traffic_school_business_proximity.business_proximity_api import get_business_proximity_many
+    return get_business_proximity_many(queries, return_exceptions=return_exceptions)
+
+
+class LocationContext:
+    """Thread-safe, per-location memo of upstream data with in-flight deduplication."""
+
+    def __init__(
+        self,
+        location: Any,
+        geocoder: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None,
+        proximity_lookup: Optional[Callable[..., List[Any]]] = None,
+    ):
+        self.location = location
+        self._geocoder = geocoder or _default_geocoder
+        self._proximity_lookup = proximity_lookup or _default_proximity_lookup
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, concurrent.futures.Future] = {}
+        self.stats = {"fetches": 0, "hits": 0}
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Return the memoized value for ``key``, running ``fetch`` only for the first caller."""
+        with self._lock:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = self._entries[key] = concurrent.futures.Future()
+                self.stats["fetches"] += 1
+            else:
+                self.stats["hits"] += 1
+        if owner:
+            try:
+                future.set_result(fetch())
+            except BaseException as error:
+                # Settle the future whatever happens, or waiters on this key would hang
+                future.set_exception(error)
+                if not isinstance(error, Exception):
+                    raise
+        # Waiters give up at the request deadline even if the owner's fetch is still running
+        return future.result(blocking_timeout())
+
+    def coordinates(self) -> Optional[Tuple[float, float]]:
+        """(lat, lng) of the location, geocoding addresses once; None if it cannot be located."""
+        coordinates = parse_coordinates(self.location)
+        if coordinates is not None:
+            return coordinates
+        return self.get_or_fetch(("geocode",), lambda: self._geocoder(str(self.location)))
+
+    def proximity_lookup(self, queries: List[Dict[str, Any]], return_exceptions: bool = False) -> List[Any]:
+        """Drop-in for get_business_proximity_many that serves repeated queries from the memo."""
+        keys = [self._places_key(query) for query in queries]
+        missing: List[int] = []
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key in self._entries:
+                    self.stats["hits"] += 1
+                else:
+                    self._entries[key] = concurrent.futures.Future()
+                    self.stats["fetches"] += 1
+                    missing.append(index)
+        if missing:
+            # Everything not fetched yet goes out as one concurrent batch
+            try:
+                fetched = self._proximity_lookup([queries[i] for i in missing], return_exceptions=True)
+            except Exception as error:
+                fetched = [error] * len(missing)
+            except BaseException as error:
+                for index in missing:
+                    self._entries[keys[index]].set_exception(error)
+                raise
+            for index, value in zip(missing, fetched):
+                if isinstance(value, Exception):
+                    self._entries[keys[index]].set_exception(value)
+                else:
+                    self._entries[keys[index]].set_result(value)
+
+        results: List[Any] = []
+        for key in keys:
+            try:
+                results.append(self._entries[key].result(blocking_timeout()))
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                results.append(error)
+        return results
+
+    @staticmethod
+    def _places_key(query: Dict[str, Any]) -> Hashable:
+        return ("places", str(query.get("location")), str(query.get("place_types")),
+                query.get("radius_meters"), query.get("max_results"))
@@ -0,0 +1,21 @@
+def parse_coordinates(location):
+    # (lat, lng) for a (lat, lng) pair or a "lat,lng" string, else None
+    if isinstance(location, (tuple, list)) and len(location) == 2:
+        parts = location
+    else:
+        parts = str(location).split(",")
+        if len(parts) != 2:
+            return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_location(location):
+    # Coordinates must be in range; anything else is taken as an address to geocode later
+    coordinates = parse_coordinates(location)
+    if coordinates is not None:
+        lat, lng = coordinates
+        return -90 <= lat <= 90 and -180 <= lng <= 180
+    return isinstance(location, str) and len(location.strip()) >= 3
@@ -0,0 +1,264 @@
+"""
+Registry of venue metrics and a concurrent evaluator for them.
+
+Each name used in ``data/metrics_map.json`` maps to a metric class plus the
+data sources it reads. Metrics are independent of each other, so the engine
+runs every requested metric at once on a thread pool under one per-request
+deadline: a full venue score costs as much as its slowest data source rather
+than the sum of all of them. Metrics still running at the deadline are
+reported as timed out instead of holding up the score.
+
+Threads cannot be interrupted, so a timed-out metric keeps its worker until
+it returns. Two things bound that: metrics run under the request deadline,
+which caps their upstream calls and waits (see ``utils.resilience.deadline``),
+and each request may hold at most ``METRIC_WORKERS_PER_REQUEST`` workers of the
+shared pool, so one request with stuck metrics cannot starve the others.
+
+Usage Example:
+    >>> results = default_registry.evaluate_sync(["parking_availability", "local_income"], "45.42,-75.69")
+    >>> results["local_income"].value
+    0.6
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from engine.location_context import LocationContext
+from metrics.competitors.competitors_metric import CompetitorsMetric
+from metrics.income_level.income_metric import IncomeMetric
+from metrics.parking.parking_metric import ParkingMetric
+from metrics.traffic.traffic_metric import TrafficMetric
+from metrics.traffic.traffic_population_density.population_density_metric import PopulationDensityMetric
+from metrics.traffic.traffic_school_business_proximity.school_business_metric import SchoolBusinessMetric
+from utils.resilience import DeadlineExceeded, deadline
+
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("METRIC_DEADLINE_SECONDS", "30"))
+METRIC_WORKERS = int(os.getenv("METRIC_WORKERS", "16"))
+METRIC_WORKERS_PER_REQUEST = int(os.getenv("METRIC_WORKERS_PER_REQUEST", str(max(1, METRIC_WORKERS // 4))))
+
+
+@dataclass(frozen=True)
+class MetricDefinition:
+    name: str
+    factory: Callable[[Any], Any]
+    # Upstream data the metric reads, e.g. "geocode", "census", "places"
+    depends_on: FrozenSet[str] = frozenset()
+    description: str = ""
+
+
+@dataclass
+class MetricResult:
+    name: str
+    value: Optional[float] = None
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _RequestSlots:
+    """Feeds one request's metrics into the shared pool, at most ``limit`` running at a time.
+
+    A slot is released only when the metric's thread actually returns, so
+    metrics abandoned at the deadline keep counting against their request.
+    """
+
+    def __init__(self, executor: concurrent.futures.ThreadPoolExecutor, limit: int):
+        self._executor = executor
+        self._slots = threading.Semaphore(max(1, limit))
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[concurrent.futures.Future, Callable[..., Any], tuple]] = deque()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._pending.append((future, fn, args))
+        self._start_pending()
+        return future
+
+    def _start_pending(self) -> None:
+        while self._slots.acquire(blocking=False):
+            with self._lock:
+                job = self._pending.popleft() if self._pending else None
+            # Jobs cancelled by _collect before they got a slot never run
+            while job is not None and not job[0].set_running_or_notify_cancel():
+                with self._lock:
+                    job = self._pending.popleft() if self._pending else None
+            if job is None:
+                self._slots.release()
+                return
+            future, fn, args = job
+            try:
+                running = self._executor.submit(fn, *args)
+            except RuntimeError as error:
+                # The registry was closed under us
+                self._slots.release()
+                future.set_exception(error)
+                continue
+            running.add_done_callback(lambda done, future=future: self._finish(future, done))
+
+    def _finish(self, future: concurrent.futures.Future, done: concurrent.futures.Future) -> None:
+        self._slots.release()
+        if done.cancelled():
+            future.set_exception(concurrent.futures.CancelledError())
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+        self._start_pending()
+
+
+class MetricRegistry:
+    """Maps metric names to implementations and evaluates them concurrently."""
+
+    def __init__(self, max_workers: int = METRIC_WORKERS, max_workers_per_request: int = METRIC_WORKERS_PER_REQUEST):
+        self._metrics: Dict[str, MetricDefinition] = {}
+        self._max_workers = max_workers
+        self._max_workers_per_request = max_workers_per_request
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[Any], Any],
+        depends_on: Iterable[str] = (),
+        description: str = "",
+    ) -> MetricDefinition:
+        """Register ``factory(location)``, which must return an object with ``calculate(context)``."""
+        definition = MetricDefinition(name, factory, frozenset(depends_on), description)
+        self._metrics[name] = definition
+        return definition
+
+    def get(self, name: str) -> MetricDefinition:
+        try:
+            return self._metrics[name]
+        except KeyError:
+            raise KeyError(f"No metric registered as {name!r}") from None
+
+    def names(self) -> List[str]:
+        return sorted(self._metrics)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._metrics
+
+    def data_sources(self, names: Iterable[str]) -> FrozenSet[str]:
+        """Union of the data the given (registered) metrics depend on."""
+        return frozenset().union(*(self._metrics[n].depends_on for n in names if n in self._metrics))
+
+    async def evaluate(
+        self,
+        names: Iterable[str],
+        location: Any,
+        timeout: Optional[float] = DEFAULT_TIMEOUT_SECONDS,
+        context: Optional[LocationContext] = None,
+    ) -> Dict[str, MetricResult]:
+        """Evaluate ``names`` for one location concurrently; results keep the input order.
+
+        All metrics share one :class:`LocationContext`, so each piece of
+        upstream data is fetched once for the location.
+        """
+        names = list(dict.fromkeys(names))
+        futures = self._submit_all(names, context or LocationContext(location), timeout)
+        if futures:
+            await asyncio.wait([asyncio.wrap_future(f) for f in futures.values()], timeout=timeout)
+        return self._collect(names, futures, timeout)
+
+    def evaluate_sync(
+        self,
+        names: Iterable[str],
+        location: Any,
+        timeout: Optional[float] = DEFAULT_TIMEOUT_SECONDS,
+        context: Optional[LocationContext] = None,
+    ) -> Dict[str, MetricResult]:
+        """Blocking counterpart of :meth:`evaluate` for scripts and worker threads."""
+        names = list(dict.fromkeys(names))
+        futures = self._submit_all(names, context or LocationContext(location), timeout)
+        if futures:
+            concurrent.futures.wait(futures.values(), timeout=timeout)
+        return self._collect(names, futures, timeout)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit_all(self, names, context, timeout) -> Dict[str, concurrent.futures.Future]:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self._max_workers, thread_name_prefix="metric")
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        slots = _RequestSlots(self._executor, self._max_workers_per_request)
+        return {
+            name: slots.submit(self._run, self._metrics[name], context, expires_at)
+            for name in names
+            if name in self._metrics
+        }
+
+    @staticmethod
+    def _run(definition: MetricDefinition, context: LocationContext, expires_at: Optional[float]):
+        started = time.perf_counter()
+        if expires_at is not None and time.monotonic() >= expires_at:
+            # Queued behind a busy pool until the request had already given up
+            raise DeadlineExceeded(f"{definition.name}: deadline passed before the metric started")
+        if expires_at is None:
+            value = definition.factory(context.location).calculate(context)
+        else:
+            # Upstream calls made by the metric share the request deadline
+            with deadline(max(expires_at - time.monotonic(), 0.0)):
+                value = definition.factory(context.location).calculate(context)
+        return float(value), (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _collect(names, futures, timeout) -> Dict[str, MetricResult]:
+        results = {}
+        for name in names:
+            future = futures.get(name)
+            if future is None:
+                results[name] = MetricResult(name, error="no implementation registered")
+            elif not future.done():
+                # Metrics still waiting for a slot are dropped; running ones finish
+                # under the request deadline and their late result is ignored
+                future.cancel()
+                results[name] = MetricResult(name, elapsed_ms=(timeout or 0) * 1000, error="deadline exceeded")
+            elif future.exception() is not None:
+                error = future.exception()
+                results[name] = MetricResult(name, error=f"{type(error).__name__}: {error}")
+            else:
+                value, elapsed_ms = future.result()
+                results[name] = MetricResult(name, value=value, elapsed_ms=round(elapsed_ms, 1))
+        return results
+
+
+default_registry = MetricRegistry()
+default_registry.register(
+    "population_density", PopulationDensityMetric, depends_on=("census",),
+    description="Residents per km² around the site",
+)
+default_registry.register(
+    "competitor_count", CompetitorsMetric, depends_on=("places",),
+    description="Fewer same-category competitors nearby scores higher",
+)
+default_registry.register(
+    "school_business_proximity", SchoolBusinessMetric, depends_on=("geocode", "places"),
+    description="Distance-weighted schools and businesses nearby",
+)
+default_registry.register(
+    "foot_traffic", TrafficMetric, depends_on=("census", "geocode", "places"),
+    description="Population density combined with school/business proximity",
+)
+default_registry.register(
+    "parking_availability", ParkingMetric, depends_on=("parking_index",),
+    description="Parking capacity within walking distance",
+)
+default_registry.register(
+    "local_income", IncomeMetric, depends_on=("census",),
+    description="Local income level",
+)
@@ -1,9 +1,28 @@
-import json
+import threading
+
+from engine.scoring_config import ScoringConfig
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def scoring_config():
+    # Loaded on first use so importing the engine never requires the data file
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = ScoringConfig.from_env()
+        return _config
+
 
 class MetricSelector:
     @staticmethod
     def get_metrics_for_category(category):
-        # Load from metrics_map.json
-        with open("data/metrics_map.json", "r") as f:
-            mapping = json.load(f)
-        return mapping.get(category.lower(), {})
+        # {metric_name: weight} for the category, empty if it is unknown
+        weights = scoring_config().category(category)
+        return weights.as_dict() if weights else {}
+
+    @staticmethod
+    def get_weights(category):
+        # Compiled CategoryWeights (metric names, indices and weight vector), or None
+        return scoring_config().category(category)
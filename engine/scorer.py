@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Scorer:
     @staticmethod
     def score(metric_tuples):
@@ -9,3 +12,73 @@ class Scorer:
             breakdown[metric] = {"value": value, "weight": weight, "weighted": weighted}
             total += weighted
         return total, breakdown
+
+    @staticmethod
+    def score_batch(values, weights, top_k=10, metric_names=None, columns=None):
+        """
+        Score many sites at once.
+
+        values:  (sites, metrics) matrix of metric values; NaN marks a missing
+                 value, which contributes nothing.
+        weights: weight vector aligned with the matrix columns, or a
+                 CategoryWeights from engine.scoring_config (which also supplies
+                 metric_names).
+        columns: optional column indices to select from a wider matrix, e.g.
+                 CategoryWeights.metric_indices for a vocabulary-wide matrix.
+        """
+        if hasattr(weights, "weights"):
+            metric_names = metric_names or weights.metric_names
+            weights = weights.weights
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 2:
+            raise ValueError(f"values must be a (sites, metrics) matrix, got shape {values.shape}")
+        if columns is not None:
+            values = values[:, np.asarray(columns, dtype=np.intp)]
+        weights = np.asarray(weights, dtype=float)
+        if values.shape[1] != weights.shape[0]:
+            raise ValueError(f"{values.shape[1]} metric columns but {weights.shape[0]} weights")
+        scores = np.nan_to_num(values, nan=0.0) @ weights
+        return BatchScores(values, weights, scores, top_k, metric_names)
+
+
+class BatchScores:
+    """Scores for a batch of sites; per-site breakdowns are built only on request."""
+
+    def __init__(self, values, weights, scores, top_k=10, metric_names=None):
+        self.values = values
+        self.weights = weights
+        self.scores = scores
+        self.metric_names = tuple(metric_names) if metric_names is not None else tuple(
+            f"metric_{i}" for i in range(len(weights))
+        )
+        self.top_indices = self._top_indices(scores, top_k)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def top(self):
+        # [(site_index, score), ...] best first
+        return [(int(i), float(self.scores[i])) for i in self.top_indices]
+
+    def breakdown(self, site_index):
+        # Same shape as Scorer.score's breakdown, for one site
+        row = self.values[site_index]
+        breakdown = {}
+        for metric, value, weight in zip(self.metric_names, row.tolist(), self.weights.tolist()):
+            missing = value != value
+            breakdown[metric] = {
+                "value": None if missing else value,
+                "weight": weight,
+                "weighted": 0.0 if missing else value * weight,
+            }
+        return float(self.scores[site_index]), breakdown
+
+    @staticmethod
+    def _top_indices(scores, top_k):
+        if top_k is None or top_k >= len(scores):
+            return np.argsort(-scores, kind="stable")
+        if top_k <= 0:
+            return np.zeros(0, dtype=np.intp)
+        # O(n) selection of the k best, then sort only those k
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -0,0 +1,166 @@
+"""
+Compiled scoring configuration loaded from ``data/metrics_map.json``.
+
+The file is parsed and validated once and each category is compiled into
+ordered metric-name, metric-index and weight NumPy vectors that the scorer can
+use directly. Scoring never touches disk: at most once every
+``check_interval`` seconds a lookup stats the file, and a changed mtime
+triggers a reload. An edit that fails validation is logged and the previous
+configuration stays in effect.
+
+Usage Example:
+    >>> config = ScoringConfig.from_env()
+    >>> weights = config.category("restaurant_cafe")
+    >>> weights.metric_names, weights.weights
+    (('population_density', 'competitor_count', ...), array([0.35, 0.3 , ...]))
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join("data", "metrics_map.json")
+WEIGHT_SUM_TOLERANCE = 1e-6
+
+
+class ScoringConfigError(ValueError):
+    """Raised when metrics_map.json does not describe a valid weighting."""
+
+
+@dataclass(frozen=True)
+class CategoryWeights:
+    category: str
+    metric_names: Tuple[str, ...]
+    # Positions of metric_names in the config-wide metric vocabulary
+    metric_indices: np.ndarray
+    weights: np.ndarray
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(zip(self.metric_names, self.weights.tolist()))
+
+
+@dataclass(frozen=True)
+class CompiledConfig:
+    metric_names: Tuple[str, ...]
+    categories: Dict[str, CategoryWeights]
+    mtime_ns: int
+
+    def metric_index(self, name: str) -> int:
+        return self.metric_names.index(name)
+
+
+def compile_config(raw: Any, mtime_ns: int = 0) -> CompiledConfig:
+    """Validate the parsed metrics map and compile it into weight vectors."""
+    if not isinstance(raw, dict) or not raw:
+        raise ScoringConfigError("metrics map must be a non-empty object of categories")
+    per_category: Dict[str, Dict[str, float]] = {}
+    for category, entry in raw.items():
+        metrics = entry.get("metrics") if isinstance(entry, dict) else None
+        if not isinstance(metrics, dict) or not metrics:
+            raise ScoringConfigError(f"{category}: expected a non-empty 'metrics' object")
+        weights = {}
+        for name, weight in metrics.items():
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight) or weight < 0:
+                raise ScoringConfigError(f"{category}.{name}: weight must be a non-negative number, got {weight!r}")
+            weights[name] = float(weight)
+        total = sum(weights.values())
+        if abs(total - 1.0) > WEIGHT_SUM_TOLERANCE:
+            raise ScoringConfigError(f"{category}: weights sum to {total:.6f}, expected 1.0")
+        per_category[category.lower()] = weights
+
+    vocabulary = tuple(sorted({name for weights in per_category.values() for name in weights}))
+    position = {name: i for i, name in enumerate(vocabulary)}
+    categories = {
+        category: CategoryWeights(
+            category=category,
+            metric_names=tuple(weights),
+            metric_indices=np.array([position[name] for name in weights], dtype=np.intp),
+            weights=np.array(list(weights.values()), dtype=float),
+        )
+        for category, weights in per_category.items()
+    }
+    for compiled in categories.values():
+        compiled.metric_indices.setflags(write=False)
+        compiled.weights.setflags(write=False)
+    return CompiledConfig(vocabulary, categories, mtime_ns)
+
+
+class ScoringConfig:
+    """Thread-safe holder of the compiled config with mtime-based hot reload."""
+
+    def __init__(self, path: str = DEFAULT_CONFIG_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._compiled = self._load()
+        self._rejected_mtime_ns: Optional[int] = None
+        self._next_check = time.monotonic() + check_interval
+
+    @classmethod
+    def from_env(cls) -> "ScoringConfig":
+        return cls(
+            path=os.getenv("METRICS_MAP_PATH", DEFAULT_CONFIG_PATH),
+            check_interval=float(os.getenv("SCORING_CONFIG_CHECK_SECONDS", "2")),
+        )
+
+    @property
+    def compiled(self) -> CompiledConfig:
+        if time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        return self._compiled
+
+    def category(self, name: str) -> Optional[CategoryWeights]:
+        return self.compiled.categories.get(name.lower())
+
+    def categories(self) -> Tuple[str, ...]:
+        return tuple(self.compiled.categories)
+
+    def reload(self) -> bool:
+        """Re-read the file now; returns False (keeping the old config) if it is invalid."""
+        with self._lock:
+            try:
+                self._compiled = self._load()
+                return True
+            except (OSError, ValueError) as error:
+                try:
+                    self._rejected_mtime_ns = self._mtime_ns()
+                except OSError:
+                    pass
+                logger.error("Keeping previous scoring config; %s is invalid: %s", self.path, error)
+                return False
+            finally:
+                self._next_check = time.monotonic() + self.check_interval
+
+    def _maybe_reload(self) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return  # Another thread just checked
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime_ns = self._mtime_ns()
+            except OSError as error:
+                logger.warning("Cannot stat %s: %s", self.path, error)
+                return
+            # An invalid edit is reported once, not on every check
+            changed = mtime_ns not in (self._compiled.mtime_ns, self._rejected_mtime_ns)
+        if changed and self.reload():
+            logger.info("Reloaded scoring config from %s", self.path)
+
+    def _mtime_ns(self) -> int:
+        return os.stat(self.path).st_mtime_ns
+
+    def _load(self) -> CompiledConfig:
+        mtime_ns = self._mtime_ns()
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return compile_config(raw, mtime_ns)
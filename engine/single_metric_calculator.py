@@ -1,6 +1,14 @@
+from engine.location_context import LocationContext
+from engine.metric_registry import DEFAULT_TIMEOUT_SECONDS, default_registry
+
+
 class SingleMetricCalculator:
     @staticmethod
     def calculate(metric_name, location):
-        # Placeholder logic - implement Google API later
-        print(f"Calculating {metric_name} for {location}")
-        return 42  # Dummy score for now
+        # Raises KeyError for metrics in metrics_map.json that have no implementation yet
+        return default_registry.get(metric_name).factory(location).calculate(LocationContext(location))
+
+    @staticmethod
+    def calculate_all(metric_names, location, timeout=DEFAULT_TIMEOUT_SECONDS):
+        # {metric_name: MetricResult}; metrics run concurrently under one deadline
+        return default_registry.evaluate_sync(metric_names, location, timeout=timeout)
@@ -0,0 +1,198 @@
+"""
+Closed-loop load driver for the census, competitor and proximity APIs.
+
+Runs a fixed number of concurrent virtual users for a given duration. Each
+user repeatedly picks a weighted scenario aimed at one of the running apps
+and records its latency. At the end the driver prints throughput, error
+counts and p50/p95/p99 latency per endpoint.
+
+Usage (with the apps pointed at ``loadtest/emulators.py``):
+    python loadtest/driver.py --concurrency 20 --duration 30 \\
+        --census http://localhost:8001 \\
+        --competitor http://localhost:8000 \\
+        --proximity http://localhost:8002
+
+Any app whose URL is omitted is skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+LOCATIONS = [
+    "centretown ottawa", "the glebe ottawa", "byward market ottawa",
+    "westboro ottawa", "little italy ottawa", "sandy hill ottawa",
+]
+BUSINESS_TYPES = ["cafe", "restaurant", "bakery", "gym", "bookstore", "bar"]
+
+
+@dataclass
+class Scenario:
+    app: str
+    name: str
+    method: str
+    path: str
+    weight: float
+    body: Any = None  # callable returning a JSON body, or None
+
+    def build_body(self) -> Optional[Dict[str, Any]]:
+        return self.body() if callable(self.body) else self.body
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    status_counts: Dict[int, int] = field(default_factory=dict)
+
+
+SCENARIOS = [
+    Scenario("census", "POST /api/v1/census/analyze", "POST", "/api/v1/census/analyze", 3, lambda: {
+        "latitude": 45.4215 + random.uniform(-0.05, 0.05),
+        "longitude": -75.6972 + random.uniform(-0.07, 0.07),
+        "walking_radius_km": 1.0,
+        "driving_radius_km": 5.0,
+    }),
+    Scenario("census", "POST /api/v1/census/analyze (address)", "POST", "/api/v1/census/analyze", 1, lambda: {
+        "address": random.choice(LOCATIONS) + " canada",
+    }),
+    Scenario("census", "GET /api/v1/census/stats", "GET", "/api/v1/census/stats", 0.5),
+    Scenario("competitor", "POST /api/v1/competitors/count", "POST", "/api/v1/competitors/count", 4, lambda: {
+        "business_type": random.choice(BUSINESS_TYPES),
+        "location": random.choice(LOCATIONS),
+        "max_results": 60,
+    }),
+    Scenario("competitor", "POST /api/v1/competitors/analyze", "POST", "/api/v1/competitors/analyze", 1, lambda: {
+        "business_type": random.choice(BUSINESS_TYPES),
+        "location": random.choice(LOCATIONS),
+        "max_results": 10,
+    }),
+    Scenario("competitor", "POST /api/v1/competitors/analyze (shallow)", "POST", "/api/v1/competitors/analyze", 2, lambda: {
+        "business_type": random.choice(BUSINESS_TYPES),
+        "location": random.choice(LOCATIONS),
+        "max_results": 20,
+        "enable_deep_analysis": False,
+    }),
+    Scenario("proximity", "POST /api/v1/business-proximity/analyze", "POST", "/api/v1/business-proximity/analyze", 3, lambda: {
+        "places_type": "school,library,university",
+        "location": random.choice(LOCATIONS),
+        "max_results": 10,
+        "enable_deep_analysis": True,
+    }),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def virtual_user(
+    clients: Dict[str, httpx.AsyncClient],
+    scenarios: List[Scenario],
+    stats: Dict[str, EndpointStats],
+    deadline: float,
+) -> None:
+    weights = [s.weight for s in scenarios]
+    while time.monotonic() < deadline:
+        scenario = random.choices(scenarios, weights=weights)[0]
+        endpoint = stats.setdefault(scenario.name, EndpointStats())
+        started = time.perf_counter()
+        try:
+            response = await clients[scenario.app].request(
+                scenario.method, scenario.path, json=scenario.build_body()
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        endpoint.latencies.append(time.perf_counter() - started)
+        endpoint.status_counts[status] = endpoint.status_counts.get(status, 0) + 1
+        if status == 0 or status >= 400:
+            endpoint.errors += 1
+
+
+async def run(targets: Dict[str, str], concurrency: int, duration: float, timeout: float) -> Dict[str, EndpointStats]:
+    scenarios = [s for s in SCENARIOS if s.app in targets]
+    if not scenarios:
+        raise SystemExit("No targets given; pass at least one of --census, --competitor, --proximity")
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    clients = {
+        app: httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+        for app, url in targets.items()
+    }
+    stats: Dict[str, EndpointStats] = {}
+    deadline = time.monotonic() + duration
+    try:
+        await asyncio.gather(*(virtual_user(clients, scenarios, stats, deadline) for _ in range(concurrency)))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients.values()))
+    return stats
+
+
+def report(stats: Dict[str, EndpointStats], elapsed: float) -> str:
+    header = f"{'endpoint':<45} {'reqs':>7} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    total_requests = 0
+    for name, endpoint in sorted(stats.items()):
+        latencies = sorted(endpoint.latencies)
+        total_requests += len(latencies)
+        lines.append(
+            f"{name:<45} {len(latencies):>7} {len(latencies) / elapsed:>8.1f} {endpoint.errors:>7} "
+            f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 95) * 1000:>9.1f} "
+            f"{percentile(latencies, 99) * 1000:>9.1f}"
+        )
+    lines.append("-" * len(header))
+    lines.append(f"total: {total_requests} requests in {elapsed:.1f}s ({total_requests / elapsed:.1f} req/s)")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the analyzer APIs")
+    parser.add_argument("--census", help="Base URL of the census API, e.g. http://localhost:8001")
+    parser.add_argument("--competitor", help="Base URL of the competitor API, e.g. http://localhost:8000")
+    parser.add_argument("--proximity", help="Base URL of the proximity API, e.g. http://localhost:8002")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="Also write raw per-endpoint stats to this file")
+    args = parser.parse_args()
+
+    targets = {
+        app: url for app, url in
+        (("census", args.census), ("competitor", args.competitor), ("proximity", args.proximity))
+        if url
+    }
+    started = time.monotonic()
+    stats = asyncio.run(run(targets, args.concurrency, args.duration, args.timeout))
+    elapsed = time.monotonic() - started
+    print(report(stats, elapsed))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                name: {
+                    "requests": len(s.latencies),
+                    "errors": s.errors,
+                    "status_counts": s.status_counts,
+                    "p50_ms": percentile(sorted(s.latencies), 50) * 1000,
+                    "p95_ms": percentile(sorted(s.latencies), 95) * 1000,
+                    "p99_ms": percentile(sorted(s.latencies), 99) * 1000,
+                }
+                for name, s in stats.items()
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Local stand-ins for the upstream APIs used by the analyzer services.
+
+A single FastAPI app emulates the request/response shapes that our code
+relies on, so the census, competitor and proximity services can be
+load-tested offline without cost or rate limits:
+
+- Google Places (New) ``POST /v1/places:searchText`` (PlacesService,
+  ProximityService, business_proximity_api), honouring ``X-Goog-FieldMask``,
+  ``pageSize`` and ``pageToken``;
+- Google Places (New) ``POST /v1/places:searchNearby`` (ProximityService),
+  honouring ``includedTypes``, ``maxResultCount`` and a circular
+  ``locationRestriction``;
+- Google Places (legacy) ``GET /maps/api/place/nearbysearch/json``
+  (ParkingAPI via ``googlemaps``), including delayed page-token activation;
+- Tavily ``POST /search`` (TavilyService);
+- OpenAI ``POST /v1/chat/completions`` (AnalysisService), including the
+  JSON-object batched mode;
+- Nominatim ``GET /search`` (AddressValidator).
+
+Every upstream gets its own latency distribution and error/throttle rates.
+
+Usage:
+    python loadtest/emulators.py --port 9000 \\
+        --latency places=lognormal:120:0.4 --latency openai=lognormal:900:0.3 \\
+        --error-rate tavily=0.02 --throttle-rate tavily=0.05
+
+Then point the services at it:
+    GOOGLE_PLACES_BASE_URL=http://localhost:9000
+    GOOGLE_MAPS_BASE_URL=http://localhost:9000
+    TAVILY_BASE_URL=http://localhost:9000
+    OPENAI_BASE_URL=http://localhost:9000/v1
+    NOMINATIM_BASE_URL=http://localhost:9000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+UPSTREAMS = ("places", "maps", "tavily", "openai", "nominatim")
+
+# Ottawa city centre; synthetic places are scattered around it
+CENTER_LAT = 45.4215
+CENTER_LNG = -75.6972
+
+
+# ---------------------------------------------------------------------------
+# Latency and fault injection
+# ---------------------------------------------------------------------------
+@dataclass
+class LatencyModel:
+    """Samples a delay in seconds from ``fixed``, ``uniform`` or ``lognormal``."""
+
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse ``fixed:MS``, ``uniform:LOW_MS:HIGH_MS`` or ``lognormal:MEDIAN_MS:SIGMA``."""
+        kind, *raw = spec.split(":")
+        params = [float(p) for p in raw]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        return cls(kind, params)
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return random.uniform(self.params[0], self.params[1]) / 1000
+        if self.kind == "lognormal":
+            median_ms, sigma = self.params
+            return random.lognormvariate(0.0, sigma) * median_ms / 1000
+        return self.params[0] / 1000
+
+
+@dataclass
+class UpstreamBehaviour:
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+
+
+BEHAVIOURS: Dict[str, UpstreamBehaviour] = {
+    "places": UpstreamBehaviour(LatencyModel("lognormal", [120, 0.4])),
+    "maps": UpstreamBehaviour(LatencyModel("lognormal", [150, 0.4])),
+    "tavily": UpstreamBehaviour(LatencyModel("lognormal", [800, 0.5])),
+    "openai": UpstreamBehaviour(LatencyModel("lognormal", [1200, 0.4])),
+    "nominatim": UpstreamBehaviour(LatencyModel("lognormal", [250, 0.3])),
+}
+
+# Legacy Places page tokens only become valid a short while after issue
+PAGE_TOKEN_DELAY_SECONDS = 2.0
+RESULTS_PER_QUERY = 60
+
+
+async def simulate(upstream: str) -> Optional[JSONResponse]:
+    """Sleep for the sampled latency; return an error response to inject, if any."""
+    behaviour = BEHAVIOURS[upstream]
+    behaviour.requests += 1
+    await asyncio.sleep(behaviour.latency.sample())
+    roll = random.random()
+    if roll < behaviour.throttle_rate:
+        behaviour.throttled += 1
+        return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+    if roll < behaviour.throttle_rate + behaviour.error_rate:
+        behaviour.errors += 1
+        return JSONResponse({"error": "injected failure"}, status_code=random.choice([500, 502, 503]))
+    return None
+
+
+def seeded(*parts: Any) -> random.Random:
+    """Deterministic RNG so the same query always yields the same places."""
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+PRICE_LEVELS = [
+    "PRICE_LEVEL_INEXPENSIVE", "PRICE_LEVEL_MODERATE",
+    "PRICE_LEVEL_EXPENSIVE", "PRICE_LEVEL_VERY_EXPENSIVE",
+]
+
+
+def place_type_from_query(query: str) -> str:
+    return query.lower().split(" in ")[0].strip().replace(" ", "_") or "establishment"
+
+
+def synthetic_place(query: str, index: int) -> Dict[str, Any]:
+    rng = seeded("place", query.lower(), index)
+    place_type = place_type_from_query(query)
+    place_id = f"emu-{hashlib.md5(f'{query.lower()}:{index}'.encode()).hexdigest()[:20]}"
+    name = f"{place_type.replace('_', ' ').title()} {index + 1}"
+    return {
+        "id": place_id,
+        "displayName": {"text": name, "languageCode": "en"},
+        "formattedAddress": f"{rng.randint(1, 999)} {rng.choice(['Bank', 'Elgin', 'Somerset', 'Rideau'])} St, Ottawa, ON",
+        "location": {
+            "latitude": CENTER_LAT + rng.uniform(-0.03, 0.03),
+            "longitude": CENTER_LNG + rng.uniform(-0.04, 0.04),
+        },
+        "types": [place_type, "point_of_interest", "establishment"],
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "userRatingCount": rng.randint(3, 2500),
+        "priceLevel": rng.choice(PRICE_LEVELS),
+        "businessStatus": "OPERATIONAL",
+        "websiteUri": f"https://example.com/{place_id}",
+        "nationalPhoneNumber": f"(613) 555-{rng.randint(1000, 9999)}",
+        "regularOpeningHours": {
+            "openNow": rng.random() < 0.7,
+            "weekdayDescriptions": ["Monday: 7:00 AM – 9:00 PM"] * 7,
+        },
+        "reviews": [
+            {
+                "rating": rng.randint(1, 5),
+                "text": {"text": f"Review {r + 1} of {name}: " + "lorem ipsum " * rng.randint(5, 30)},
+                "authorAttribution": {"displayName": f"Reviewer {r + 1}"},
+            }
+            for r in range(5)
+        ],
+    }
+
+
+def apply_field_mask(data: Dict[str, Any], mask: str) -> Dict[str, Any]:
+    """Keep only the top-level and ``places.*`` fields named in the mask."""
+    fields = [f.strip() for f in mask.split(",") if f.strip()]
+    if not fields or "*" in fields:
+        return data
+    place_fields = {f.split(".", 1)[1] for f in fields if f.startswith("places.")}
+    result: Dict[str, Any] = {}
+    if "places" in data and place_fields:
+        result["places"] = [
+            {k: v for k, v in place.items() if k in place_fields} for place in data["places"]
+        ]
+    for key, value in data.items():
+        if key != "places" and key in fields:
+            result[key] = value
+    return result
+
+
+# ---------------------------------------------------------------------------
+# App
+# ---------------------------------------------------------------------------
+app = FastAPI(title="Upstream API emulators", version="1.0.0")
+
+
+@app.post("/v1/places:searchText")
+async def places_search_text(request: Request):
+    injected = await simulate("places")
+    if injected:
+        return injected
+    body = await request.json()
+    query = body.get("textQuery", "")
+    page_size = max(1, min(int(body.get("pageSize", 20)), 20))
+    offset = int(body.get("pageToken") or 0)
+    min_rating = float(body.get("minRating", 0.0))
+
+    places = [synthetic_place(query, i) for i in range(offset, min(offset + page_size, RESULTS_PER_QUERY))]
+    places = [p for p in places if p["rating"] >= min_rating]
+    data: Dict[str, Any] = {"places": places}
+    if offset + page_size < RESULTS_PER_QUERY:
+        data["nextPageToken"] = str(offset + page_size)
+    return apply_field_mask(data, request.headers.get("X-Goog-FieldMask", "*"))
+
+
+@app.post("/v1/places:searchNearby")
+async def places_search_nearby(request: Request):
+    injected = await simulate("places")
+    if injected:
+        return injected
+    body = await request.json()
+    circle = body.get("locationRestriction", {}).get("circle", {})
+    center = circle.get("center", {})
+    lat = float(center.get("latitude", CENTER_LAT))
+    lng = float(center.get("longitude", CENTER_LNG))
+    radius = float(circle.get("radius", 1000.0))
+    max_results = max(1, min(int(body.get("maxResultCount", 20)), 20))
+
+    # Interleave the requested types, placing each result inside the circle
+    per_type = [
+        [synthetic_place(place_type, i) for i in range(RESULTS_PER_QUERY)]
+        for place_type in body.get("includedTypes") or ["establishment"]
+    ]
+    places = []
+    for index in range(RESULTS_PER_QUERY):
+        for candidates in per_type:
+            if len(places) < max_results:
+                place = dict(candidates[index])
+                spot = seeded("nearby", place["id"], lat, lng, radius)
+                place["id"] = f"{place['id']}-{spot.getrandbits(32):08x}"
+                distance = radius * spot.random() ** 0.5
+                bearing = spot.uniform(0, 2 * math.pi)
+                place["location"] = {
+                    "latitude": lat + distance * math.cos(bearing) / 111_320,
+                    "longitude": lng + distance * math.sin(bearing) / (111_320 * math.cos(math.radians(lat))),
+                }
+                places.append(place)
+    return apply_field_mask({"places": places}, request.headers.get("X-Goog-FieldMask", "*"))
+
+
+@app.get("/maps/api/place/nearbysearch/json")
+async def legacy_nearby_search(request: Request):
+    injected = await simulate("maps")
+    if injected:
+        return injected
+    params = request.query_params
+    token = params.get("pagetoken")
+    if token:
+        location, radius, offset, issued_at = token.split("|")
+        if time.time() - float(issued_at) < PAGE_TOKEN_DELAY_SECONDS:
+            return {"status": "INVALID_REQUEST", "results": []}
+        offset = int(offset)
+    else:
+        location, radius, offset = params.get("location", ""), params.get("radius", "1000"), 0
+
+    lat, lng = (float(v) for v in location.split(","))
+    rng = seeded("parking", location, radius)
+    total = rng.randint(5, 60)
+    results = []
+    for i in range(offset, min(offset + 20, total)):
+        spot = seeded("parking", location, radius, i)
+        results.append({
+            "place_id": f"emu-parking-{hashlib.md5(f'{location}:{i}'.encode()).hexdigest()[:16]}",
+            "name": f"Parking Lot {i + 1}",
+            "vicinity": f"{spot.randint(1, 999)} Parking Ave, Ottawa",
+            "geometry": {"location": {
+                "lat": lat + spot.uniform(-0.008, 0.008),
+                "lng": lng + spot.uniform(-0.011, 0.011),
+            }},
+            "rating": round(spot.uniform(2.5, 4.8), 1),
+            "user_ratings_total": spot.randint(0, 300),
+            "types": ["parking", "point_of_interest", "establishment"],
+        })
+    data: Dict[str, Any] = {"status": "OK" if results else "ZERO_RESULTS", "results": results}
+    if offset + 20 < total:
+        data["next_page_token"] = f"{location}|{radius}|{offset + 20}|{time.time()}"
+    return data
+
+
+@app.post("/search")
+async def tavily_search(request: Request):
+    injected = await simulate("tavily")
+    if injected:
+        return injected
+    body = await request.json()
+    query = body.get("query", "")
+    rng = seeded("tavily", query)
+    results = [
+        {
+            "title": f"{query} - result {i + 1}",
+            "url": f"https://example.com/{hashlib.md5(f'{query}:{i}'.encode()).hexdigest()[:12]}",
+            "content": "Customers mention " + " ".join(rng.choice(["friendly", "slow", "busy", "cozy", "pricey"]) for _ in range(40)),
+            "score": round(rng.uniform(0.3, 0.99), 3),
+        }
+        for i in range(int(body.get("max_results", 4)))
+    ]
+    answer = f"{query.split(' reviews')[0]} is a well-reviewed local business." if body.get("include_answer") else None
+    return {"query": query, "answer": answer, "results": results, "response_time": 0.5}
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat_completions(request: Request):
+    injected = await simulate("openai")
+    if injected:
+        return injected
+    body = await request.json()
+    user_content = next((m["content"] for m in body.get("messages", []) if m.get("role") == "user"), "")
+
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        ids = re.findall(r"^### Competitor (\S+)$", user_content, flags=re.MULTILINE)
+        content = json.dumps({"analyses": [
+            {"id": competitor_id, "analysis": f"Emulated analysis for competitor {competitor_id}."}
+            for competitor_id in ids
+        ]})
+    else:
+        first_line = user_content.split("\n", 1)[0]
+        content = f"Emulated analysis. {first_line} holds a steady position in the local market."
+
+    prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-emu-{random.getrandbits(48):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-3.5-turbo"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.get("/search")
+async def nominatim_search(request: Request):
+    injected = await simulate("nominatim")
+    if injected:
+        return injected
+    query = request.query_params.get("q", "")
+    rng = seeded("nominatim", query.lower())
+    return [{
+        "lat": str(CENTER_LAT + rng.uniform(-0.05, 0.05)),
+        "lon": str(CENTER_LNG + rng.uniform(-0.07, 0.07)),
+        "display_name": f"{query.title()}, Ottawa, Ontario, Canada",
+        "address": {"city": "Ottawa", "state": "Ontario", "country": "Canada"},
+    }]
+
+
+@app.get("/emulator/stats")
+async def emulator_stats():
+    return {
+        name: {
+            "requests": b.requests,
+            "errors": b.errors,
+            "throttled": b.throttled,
+            "latency": {"kind": b.latency.kind, "params": b.latency.params},
+        }
+        for name, b in BEHAVIOURS.items()
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def _parse_assignments(values: List[str], flag: str) -> Dict[str, str]:
+    parsed = {}
+    for value in values:
+        upstream, _, spec = value.partition("=")
+        if upstream not in UPSTREAMS or not spec:
+            raise SystemExit(f"{flag} expects UPSTREAM=VALUE with UPSTREAM in {', '.join(UPSTREAMS)}")
+        parsed[upstream] = spec
+    return parsed
+
+
+def main() -> None:
+    global PAGE_TOKEN_DELAY_SECONDS, RESULTS_PER_QUERY
+
+    parser = argparse.ArgumentParser(description="Run local upstream API emulators")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", action="append", default=[],
+                        help="UPSTREAM=fixed:MS | uniform:LOW:HIGH | lognormal:MEDIAN_MS:SIGMA")
+    parser.add_argument("--error-rate", action="append", default=[], help="UPSTREAM=FRACTION of 5xx responses")
+    parser.add_argument("--throttle-rate", action="append", default=[], help="UPSTREAM=FRACTION of 429 responses")
+    parser.add_argument("--page-token-delay", type=float, default=PAGE_TOKEN_DELAY_SECONDS)
+    parser.add_argument("--results-per-query", type=int, default=RESULTS_PER_QUERY)
+    args = parser.parse_args()
+
+    for upstream, spec in _parse_assignments(args.latency, "--latency").items():
+        BEHAVIOURS[upstream].latency = LatencyModel.parse(spec)
+    for upstream, rate in _parse_assignments(args.error_rate, "--error-rate").items():
+        BEHAVIOURS[upstream].error_rate = float(rate)
+    for upstream, rate in _parse_assignments(args.throttle_rate, "--throttle-rate").items():
+        BEHAVIOURS[upstream].throttle_rate = float(rate)
+    PAGE_TOKEN_DELAY_SECONDS = args.page_token_delay
+    RESULTS_PER_QUERY = args.results_per_query
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ class CompetitorsMetric:
     def __init__(self, location):
         self.location = location
 
-    def calculate(self):
+    def calculate(self, context=None):
         competitor_count = 5
         if competitor_count == 0:
             return 1.0
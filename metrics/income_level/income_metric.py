@@ -2,5 +2,5 @@ class IncomeMetric:
     def __init__(self, location):
         self.location = location
 
-    def calculate(self):
+    def calculate(self, context=None):
         return 0.6
@@ -0,0 +1,161 @@
+"""
+async_parking_api.py
+Async counterpart of :class:`metrics.parking.parking_api.ParkingAPI` built on
+the shared pooled ``httpx`` clients instead of the blocking ``googlemaps``
+package.
+
+Unlike ``ParkingAPI.nearby`` it follows ``next_page_token`` automatically.
+Google only activates a page token a couple of seconds after issuing it, so
+each location waits ``page_delay`` before asking for the next page and
+retries briefly while the token is still ``INVALID_REQUEST``. ``nearby_many``
+runs many locations concurrently; their token waits overlap, so a batch of
+sites takes roughly one multi-page fetch rather than one per site.
+
+Usage Example:
+    >>> api = AsyncParkingAPI(api_key="YOUR_GOOGLE_API_KEY")
+    >>> places = await api.nearby(45.4215, -75.6972, radius=800)
+    >>> per_site = await api.nearby_many([(45.4215, -75.6972), (45.4010, -75.6890)])
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from utils.http_clients import HttpClientRegistry, upstream_url
+from utils.resilience import ResilienceRegistry
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class ParkingAPIError(Exception):
+    """Raised when the Places API rejects a parking search outright."""
+
+
+class AsyncParkingAPI:
+    """Async Google Places nearby search restricted to *parking*, with paging."""
+
+    DEFAULT_RADIUS_METERS = 1000  # Roughly 2–3 city blocks
+    # Nearby Search returns 20 results per page and at most 3 pages
+    MAX_PAGES = 3
+    # Statuses that end a search without results rather than failing it
+    EMPTY_STATUSES = {"ZERO_RESULTS"}
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        http_clients: Optional[HttpClientRegistry] = None,
+        resilience: Optional[ResilienceRegistry] = None,
+        page_delay: float = 2.0,
+        token_retry_delay: float = 0.5,
+        token_retries: int = 6,
+        concurrency: int = 10,
+    ) -> None:
+        if not api_key:
+            raise ValueError("`api_key` must be provided and non-empty.")
+        self.api_key = api_key
+        self.url = upstream_url("google_maps", "/maps/api/place/nearbysearch/json")
+        self.http_clients = http_clients or HttpClientRegistry()
+        self.resilience = resilience or ResilienceRegistry()
+        self.page_delay = page_delay
+        self.token_retry_delay = token_retry_delay
+        self.token_retries = token_retries
+        # Bounds requests in flight, not locations: token waits hold no slot
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        *,
+        radius: int | None = None,
+        open_now: bool | None = None,
+        language: str | None = None,
+        max_pages: int = MAX_PAGES,
+    ) -> List[Dict[str, Any]]:
+        """Return every parking place near the coordinates, across all pages, deduplicated by place_id."""
+        params: Dict[str, Any] = {
+            "location": f"{latitude},{longitude}",
+            "radius": radius or self.DEFAULT_RADIUS_METERS,
+            "type": "parking",
+        }
+        if open_now:
+            params["opennow"] = "true"
+        if language:
+            params["language"] = language
+
+        places: Dict[str, Dict[str, Any]] = {}
+        response = await self._search(params)
+        for page in range(max(1, max_pages)):
+            for place in response.get("results", []):
+                places.setdefault(place.get("place_id") or f"_{len(places)}", place)
+            token = response.get("next_page_token")
+            if not token or page + 1 >= max_pages:
+                break
+            await asyncio.sleep(self.page_delay)
+            response = await self._next_page(token)
+            if response is None:
+                break
+        return list(places.values())
+
+    async def nearby_many(
+        self,
+        coordinates: Iterable[Tuple[float, float]],
+        *,
+        radius: int | None = None,
+        open_now: bool | None = None,
+        max_pages: int = MAX_PAGES,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Run ``nearby`` for many (lat, lng) pairs concurrently; results follow input order."""
+        return await asyncio.gather(
+            *(
+                self.nearby(lat, lng, radius=radius, open_now=open_now, max_pages=max_pages)
+                for lat, lng in coordinates
+            ),
+            return_exceptions=return_exceptions,
+        )
+
+    async def _next_page(self, token: str) -> Optional[Dict[str, Any]]:
+        """Fetch a follow-up page, retrying while Google has not activated the token yet."""
+        for attempt in range(self.token_retries + 1):
+            response = await self._search({"pagetoken": token}, token_pending_ok=True)
+            if response.get("status") != "INVALID_REQUEST":
+                return response
+            await asyncio.sleep(self.token_retry_delay)
+        logger.warning("Parking page token never became valid; returning the pages fetched so far")
+        return None
+
+    async def _search(self, params: Dict[str, Any], token_pending_ok: bool = False) -> Dict[str, Any]:
+        client = self.http_clients.get("google_maps")
+        query = dict(params, key=self.api_key)
+
+        async def send() -> httpx.Response:
+            async with self._semaphore:
+                response = await client.get(self.url, params=query)
+            response.raise_for_status()
+            return response
+
+        data = (await self.resilience.get("google_maps").call(send)).json()
+        status = data.get("status")
+        if status == "OK" or status in self.EMPTY_STATUSES:
+            return data
+        if status == "INVALID_REQUEST" and token_pending_ok:
+            return data
+        raise ParkingAPIError(f"Google Places API returned {status}: {data.get('error_message', '')}".strip())
+
+    @staticmethod
+    def summarize(place: Dict[str, Any]) -> Dict[str, Any]:
+        """Return concise subset of a place result."""
+        return {
+            "place_id": place.get("place_id"),
+            "name": place.get("name"),
+            "address": place.get("vicinity"),
+            "rating": place.get("rating"),
+            "user_ratings_total": place.get("user_ratings_total"),
+            "location": place.get("geometry", {}).get("location"),
+        }
@@ -16,6 +16,9 @@ Dependencies:
 The wrapper currently exposes a single helper (`nearby`) restricted to
 `type="parking"`, aligning with the metrics requirement. Feel free to extend
 this module with additional helpers (e.g. place details) as needed.
+
+For automatic paging and batches of locations, use the async
+:class:`metrics.parking.async_parking_api.AsyncParkingAPI` instead.
 """
 from __future__ import annotations
 
@@ -61,7 +64,11 @@ class ParkingAPI:
         if not api_key:
             raise ValueError("`api_key` must be provided and non-empty.")
 
-        self._client = googlemaps.Client(key=api_key, timeout=timeout)
+        client_kwargs: Dict[str, Any] = {}
+        # GOOGLE_MAPS_BASE_URL lets load tests point at a local emulator
+        if os.getenv("GOOGLE_MAPS_BASE_URL"):
+            client_kwargs["base_url"] = os.getenv("GOOGLE_MAPS_BASE_URL")
+        self._client = googlemaps.Client(key=api_key, timeout=timeout, **client_kwargs)
         logger.debug("Initialized ParkingAPI client with timeout=%ss", timeout)
 
     # -------------------------------------------------------------------
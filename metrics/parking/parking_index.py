@@ -0,0 +1,425 @@
+"""
+parking_index.py
+Offline parking-supply index built from local open data.
+
+Live Places parking searches are slow, capped at 60 results and say nothing
+about capacity. This module ingests a local extract once, for example a
+municipal parking lots CSV or an OpenStreetMap export of ``amenity=parking``,
+and builds a capacity-weighted grid index. ``ParkingMetric`` then answers
+"how many spaces within walking distance" in microseconds.
+
+Supported inputs:
+    - CSV with latitude/longitude columns (``lat``/``latitude``,
+      ``lng``/``lon``/``longitude``) and an optional capacity column
+      (``capacity``/``spaces``/``stalls``), plus optional ``id`` and ``name``;
+    - OSM JSON as returned by Overpass (``nodes``/``ways`` with ``center``),
+      or GeoJSON point/polygon features, using the ``capacity`` tag when
+      present and an estimate from the ``parking`` tag otherwise.
+
+Usage Example:
+    python -m metrics.parking.parking_index build --csv lots.csv \\
+        --osm ottawa_parking.json --out data/parking_index.npz
+    python -m metrics.parking.parking_index query 45.4215 -75.6972 --radius 400
+    python -m metrics.parking.parking_index refresh 45.4215,-75.6972 45.4010,-75.6890
+
+The live Places API is only used by the optional ``refresh`` command, which
+adds lots the open data does not know about with an estimated capacity.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine.location_validator import parse_coordinates
+from utils.geo import haversine_m
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+DEFAULT_INDEX_PATH = os.path.join("data", "parking_index.npz")
+
+# Spaces assumed when a source gives no capacity, by OSM ``parking=*`` value
+ESTIMATED_CAPACITY = {
+    "multi-storey": 300,
+    "underground": 150,
+    "rooftop": 80,
+    "surface": 40,
+    "lane": 10,
+    "street_side": 8,
+    "on_street": 8,
+}
+DEFAULT_CAPACITY = 30
+
+LAT_COLUMNS = ("lat", "latitude", "y")
+LNG_COLUMNS = ("lng", "lon", "long", "longitude", "x")
+CAPACITY_COLUMNS = ("capacity", "spaces", "stalls", "num_spaces")
+
+
+@dataclass
+class ParkingLot:
+    lot_id: str
+    latitude: float
+    longitude: float
+    capacity: float
+    name: str = ""
+
+
+def _first(row: Dict[str, Any], columns: Sequence[str]) -> Optional[str]:
+    lowered = {key.strip().lower(): value for key, value in row.items() if key}
+    for column in columns:
+        value = lowered.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _capacity(value: Any, parking_kind: Optional[str] = None) -> float:
+    try:
+        capacity = float(value)
+        if capacity > 0:
+            return capacity
+    except (TypeError, ValueError):
+        pass
+    return float(ESTIMATED_CAPACITY.get((parking_kind or "").lower(), DEFAULT_CAPACITY))
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+def load_csv(path: str) -> List[ParkingLot]:
+    """Read parking lots from a CSV; rows without coordinates are skipped."""
+    lots = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for number, row in enumerate(csv.DictReader(f)):
+            lat, lng = _first(row, LAT_COLUMNS), _first(row, LNG_COLUMNS)
+            try:
+                latitude, longitude = float(lat), float(lng)
+            except (TypeError, ValueError):
+                continue
+            lots.append(ParkingLot(
+                lot_id=str(_first(row, ("id", "lot_id", "objectid")) or f"{os.path.basename(path)}:{number}"),
+                latitude=latitude,
+                longitude=longitude,
+                capacity=_capacity(_first(row, CAPACITY_COLUMNS), _first(row, ("parking", "type"))),
+                name=_first(row, ("name", "lot_name")) or "",
+            ))
+    return lots
+
+
+def load_osm(path: str) -> List[ParkingLot]:
+    """Read ``amenity=parking`` features from Overpass JSON or GeoJSON."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    lots = []
+    if "elements" in data:  # Overpass JSON
+        for element in data["elements"]:
+            tags = element.get("tags", {})
+            if tags.get("amenity") != "parking":
+                continue
+            point = element if "lat" in element else element.get("center")
+            if not point:
+                continue
+            lots.append(ParkingLot(
+                lot_id=f"osm:{element.get('type', 'node')}/{element.get('id')}",
+                latitude=float(point["lat"]),
+                longitude=float(point["lon"]),
+                capacity=_capacity(tags.get("capacity"), tags.get("parking")),
+                name=tags.get("name", ""),
+            ))
+    else:  # GeoJSON
+        for number, feature in enumerate(data.get("features", [])):
+            properties = feature.get("properties") or {}
+            if properties.get("amenity", "parking") != "parking":
+                continue
+            coordinates = _geojson_point(feature.get("geometry") or {})
+            if coordinates is None:
+                continue
+            lots.append(ParkingLot(
+                lot_id=str(properties.get("@id") or feature.get("id") or f"{os.path.basename(path)}:{number}"),
+                latitude=coordinates[1],
+                longitude=coordinates[0],
+                capacity=_capacity(properties.get("capacity"), properties.get("parking")),
+                name=properties.get("name", ""),
+            ))
+    return lots
+
+
+def _geojson_point(geometry: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """(lng, lat) of a Point, or the vertex average of a (Multi)Polygon."""
+    kind, coordinates = geometry.get("type"), geometry.get("coordinates")
+    if not coordinates:
+        return None
+    if kind == "Point":
+        return float(coordinates[0]), float(coordinates[1])
+    if kind == "Polygon":
+        ring = np.asarray(coordinates[0], dtype=float)
+    elif kind == "MultiPolygon":
+        ring = np.concatenate([np.asarray(polygon[0], dtype=float) for polygon in coordinates])
+    else:
+        return None
+    return float(ring[:, 0].mean()), float(ring[:, 1].mean())
+
+
+def deduplicate(lots: Iterable[ParkingLot], within_m: float = 25.0) -> List[ParkingLot]:
+    """Drop lots that repeat an earlier id, or sit within ``within_m`` of an earlier lot."""
+    kept: List[ParkingLot] = []
+    seen_ids = set()
+    cells: Dict[Tuple[int, int], List[ParkingLot]] = {}
+    for lot in lots:
+        if lot.lot_id in seen_ids:
+            continue
+        cell = (int(lot.latitude * 1000), int(lot.longitude * 1000))
+        neighbours = (
+            other
+            for dlat in (-1, 0, 1) for dlng in (-1, 0, 1)
+            for other in cells.get((cell[0] + dlat, cell[1] + dlng), ())
+        )
+        if any(haversine_m(lot.latitude, lot.longitude, o.latitude, o.longitude) <= within_m for o in neighbours):
+            continue
+        seen_ids.add(lot.lot_id)
+        cells.setdefault(cell, []).append(lot)
+        kept.append(lot)
+    return kept
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class ParkingIndex:
+    """
+    Capacity-weighted uniform grid over parking lots.
+
+    Lots are sorted by grid cell and stored as flat numpy arrays with a
+    CSR-style ``cell_starts`` table, so a query only touches the few cells
+    overlapping its circle and computes distances for those lots in one
+    vectorized step.
+    """
+
+    def __init__(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        capacities: np.ndarray,
+        lot_ids: np.ndarray,
+        cell_size_m: float = 250.0,
+        origin: Optional[Tuple[float, float]] = None,
+    ):
+        self.cell_size_m = cell_size_m
+        if origin is None:
+            origin = (float(latitudes.min()), float(longitudes.min())) if len(latitudes) else (0.0, 0.0)
+        self.origin = origin
+        self.cell_lat = cell_size_m / METERS_PER_DEGREE_LAT
+        reference_lat = float(np.mean(latitudes)) if len(latitudes) else origin[0]
+        self.cell_lng = cell_size_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(reference_lat)), 1e-6))
+
+        rows, cols = self._cells(latitudes, longitudes)
+        self.rows = int(rows.max()) + 1 if len(rows) else 1
+        self.cols = int(cols.max()) + 1 if len(cols) else 1
+        keys = rows * self.cols + cols
+        order = np.argsort(keys, kind="stable")
+        self.latitudes = np.asarray(latitudes, dtype=float)[order]
+        self.longitudes = np.asarray(longitudes, dtype=float)[order]
+        self.capacities = np.asarray(capacities, dtype=float)[order]
+        self.lot_ids = np.asarray(lot_ids).astype(str)[order]
+        self.cell_starts = np.searchsorted(keys[order], np.arange(self.rows * self.cols + 1))
+
+    @classmethod
+    def from_lots(cls, lots: Sequence[ParkingLot], cell_size_m: float = 250.0) -> "ParkingIndex":
+        return cls(
+            np.array([lot.latitude for lot in lots], dtype=float),
+            np.array([lot.longitude for lot in lots], dtype=float),
+            np.array([lot.capacity for lot in lots], dtype=float),
+            np.array([lot.lot_id for lot in lots], dtype=str),
+            cell_size_m=cell_size_m,
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def lots(self) -> List[ParkingLot]:
+        return [
+            ParkingLot(str(i), float(lat), float(lng), float(cap))
+            for i, lat, lng, cap in zip(self.lot_ids, self.latitudes, self.longitudes, self.capacities)
+        ]
+
+    def supply_within(self, latitude: float, longitude: float, radius_m: float = 400.0) -> float:
+        """Total capacity of the lots within ``radius_m`` of the point."""
+        candidates = self._candidates(latitude, longitude, radius_m)
+        if candidates is None:
+            return 0.0
+        lats, lngs, caps = candidates
+        return float(caps[haversine_m(latitude, longitude, lats, lngs) <= radius_m].sum())
+
+    def supply_within_many(self, points: Sequence[Tuple[float, float]], radius_m: float = 400.0) -> np.ndarray:
+        return np.array([self.supply_within(lat, lng, radius_m) for lat, lng in points], dtype=float)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written to a temporary file and renamed, so a running ParkingMetric
+        # that reloads the index on change never reads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                latitudes=self.latitudes,
+                longitudes=self.longitudes,
+                capacities=self.capacities,
+                lot_ids=self.lot_ids,
+                meta=np.array([self.cell_size_m, self.origin[0], self.origin[1]]),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ParkingIndex":
+        with np.load(path, allow_pickle=False) as data:
+            cell_size_m, origin_lat, origin_lng = data["meta"]
+            return cls(
+                data["latitudes"], data["longitudes"], data["capacities"], data["lot_ids"],
+                cell_size_m=float(cell_size_m), origin=(float(origin_lat), float(origin_lng)),
+            )
+
+    def _cells(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.floor((np.asarray(latitudes, dtype=float) - self.origin[0]) / self.cell_lat).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes, dtype=float) - self.origin[1]) / self.cell_lng).astype(np.int64)
+        return rows, cols
+
+    def _candidates(self, latitude: float, longitude: float, radius_m: float):
+        span_rows = int(math.ceil(radius_m / self.cell_size_m))
+        dlng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+        span_cols = int(math.ceil(dlng / self.cell_lng))
+        row = int(math.floor((latitude - self.origin[0]) / self.cell_lat))
+        col = int(math.floor((longitude - self.origin[1]) / self.cell_lng))
+        row_lo, row_hi = max(row - span_rows, 0), min(row + span_rows, self.rows - 1)
+        col_lo, col_hi = max(col - span_cols, 0), min(col + span_cols, self.cols - 1)
+        if row_lo > row_hi or col_lo > col_hi:
+            return None
+        # Cells of one row are contiguous in the sorted arrays
+        slices = [
+            slice(self.cell_starts[r * self.cols + col_lo], self.cell_starts[r * self.cols + col_hi + 1])
+            for r in range(row_lo, row_hi + 1)
+        ]
+        if len(slices) == 1:
+            s = slices[0]
+            return self.latitudes[s], self.longitudes[s], self.capacities[s]
+        index = np.concatenate([np.arange(s.start, s.stop) for s in slices])
+        return self.latitudes[index], self.longitudes[index], self.capacities[index]
+
+
+def build_index(
+    csv_paths: Iterable[str] = (),
+    osm_paths: Iterable[str] = (),
+    cell_size_m: float = 250.0,
+) -> ParkingIndex:
+    lots: List[ParkingLot] = []
+    for path in csv_paths:
+        lots.extend(load_csv(path))
+    for path in osm_paths:
+        lots.extend(load_osm(path))
+    lots = deduplicate(lots)
+    if not lots:
+        raise ValueError("No parking lots with coordinates found in the given inputs")
+    return ParkingIndex.from_lots(lots, cell_size_m)
+
+
+async def refresh_from_api(
+    index: ParkingIndex,
+    points: Sequence[Tuple[float, float]],
+    api_key: str,
+    radius_m: int = 1000,
+) -> ParkingIndex:
+    """Return a new index with live Places parking lots near ``points`` added.
+
+    Lots the open data already has (same id, or within 25 m) are kept as is;
+    new ones get ``DEFAULT_CAPACITY`` since Places reports no capacity.
+    """
+    from metrics.parking.async_parking_api import AsyncParkingAPI
+
+    api = AsyncParkingAPI(api_key)
+    try:
+        responses = await api.nearby_many(points, radius=radius_m, return_exceptions=True)
+    finally:
+        await api.http_clients.aclose()
+    live = []
+    for response in responses:
+        if isinstance(response, Exception):
+            logger.warning("Parking refresh lookup failed: %s", response)
+            continue
+        for place in response:
+            location = place.get("geometry", {}).get("location") or {}
+            if "lat" in location and "lng" in location:
+                live.append(ParkingLot(
+                    lot_id=f"places:{place.get('place_id')}",
+                    latitude=float(location["lat"]),
+                    longitude=float(location["lng"]),
+                    capacity=float(DEFAULT_CAPACITY),
+                    name=place.get("name", ""),
+                ))
+    return ParkingIndex.from_lots(deduplicate(index.lots() + live), index.cell_size_m)
+
+
+# ---------------------------------------------------------------------------
+# CLI usage
+# ---------------------------------------------------------------------------
+def _parse_point(value: str) -> Tuple[float, float]:
+    point = parse_coordinates(value)
+    if point is None:
+        raise ValueError(f"expected lat,lng, got {value!r}")
+    return point
+
+
+if __name__ == "__main__":  # pragma: no cover
+    import argparse
+    import asyncio
+    import time
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Build and query the parking-supply index")
+    parser.add_argument("--index", default=os.getenv("PARKING_INDEX_PATH", DEFAULT_INDEX_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the index from local open data")
+    build.add_argument("--csv", action="append", default=[], help="Parking lots CSV (repeatable)")
+    build.add_argument("--osm", action="append", default=[], help="Overpass JSON or GeoJSON (repeatable)")
+    build.add_argument("--cell-size-m", type=float, default=250.0)
+
+    query = commands.add_parser("query", help="Parking capacity within walking distance of a point")
+    query.add_argument("lat", type=float)
+    query.add_argument("lng", type=float)
+    query.add_argument("--radius", type=float, default=400.0)
+
+    refresh = commands.add_parser("refresh", help="Add live Places parking lots around the given points")
+    refresh.add_argument("points", nargs="+", type=_parse_point, help="lat,lng")
+    refresh.add_argument("--radius", type=int, default=1000)
+    refresh.add_argument("--api-key", default=os.getenv("GOOGLE_PLACES_API_KEY"))
+
+    args = parser.parse_args()
+    if args.command == "build":
+        parking_index = build_index(args.csv, args.osm, args.cell_size_m)
+        parking_index.save(args.index)
+        print(f"Indexed {len(parking_index)} lots, {parking_index.capacities.sum():.0f} spaces -> {args.index}")
+    elif args.command == "query":
+        parking_index = ParkingIndex.load(args.index)
+        started = time.perf_counter()
+        supply = parking_index.supply_within(args.lat, args.lng, args.radius)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        print(json.dumps({"spaces": supply, "radius_m": args.radius, "query_us": round(elapsed_us, 1)}))
+    else:
+        if not args.api_key:
+            parser.error("Google API key required via --api-key or GOOGLE_PLACES_API_KEY")
+        parking_index = ParkingIndex.load(args.index)
+        refreshed = asyncio.run(refresh_from_api(parking_index, args.points, args.api_key, args.radius))
+        refreshed.save(args.index)
+        print(f"Index now has {len(refreshed)} lots (+{len(refreshed) - len(parking_index)} from Places)")
@@ -1,6 +1,62 @@
+import logging
+import math
+import os
+import threading
+
+from engine.location_validator import parse_coordinates
+from metrics.parking.parking_index import DEFAULT_INDEX_PATH, ParkingIndex
+
+logger = logging.getLogger(__name__)
+
+# (path, mtime, index) of the last index loaded
+_index = None
+_index_lock = threading.Lock()
+_missing_paths = set()
+
+
+def _default_index():
+    """The index at PARKING_INDEX_PATH, reloaded when the file changes; None until it has been built."""
+    global _index
+    path = os.getenv("PARKING_INDEX_PATH", DEFAULT_INDEX_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        with _index_lock:
+            if path not in _missing_paths:
+                _missing_paths.add(path)
+                logger.info("No parking index at %s; build one with `python -m metrics.parking.parking_index build`", path)
+        return None
+    with _index_lock:
+        if _index is None or _index[:2] != (path, mtime):
+            _index = (path, mtime, ParkingIndex.load(path))
+            _missing_paths.discard(path)
+        return _index[2]
+
+
 class ParkingMetric:
-    def __init__(self, location):
+    """
+    Parking availability from the capacity of lots within walking distance.
+
+    Supply comes from the offline parking index (see parking_index); no API
+    call is made. Without an index or coordinates the metric keeps its old
+    neutral value.
+    """
+
+    WALKING_DISTANCE_M = 400.0
+    # Spaces within walking distance at which the score reaches ~0.63
+    SUPPLY_SATURATION = 300.0
+    FALLBACK_SCORE = 0.7
+
+    def __init__(self, location, index=None):
         self.location = location
+        self.index = index
 
-    def calculate(self):
-        return 0.7
+    def calculate(self, context=None):
+        index = self.index or _default_index()
+        coordinates = parse_coordinates(self.location)
+        if coordinates is None and context is not None and index is not None:
+            coordinates = context.coordinates()
+        if index is None or coordinates is None:
+            return self.FALLBACK_SCORE
+        supply = index.supply_within(coordinates[0], coordinates[1], self.WALKING_DISTANCE_M)
+        return round(1.0 - math.exp(-supply / self.SUPPLY_SATURATION), 2)
@@ -5,7 +5,8 @@ class TrafficMetric:
     def __init__(self, location):
         self.location = location
 
-    def calculate(self):
-        pop_score = PopulationDensityMetric(self.location).calculate()
-        sb_score = SchoolBusinessMetric(self.location).calculate()
+    def calculate(self, context=None):
+        # Both parts share the caller's LocationContext, so the location is fetched once
+        pop_score = PopulationDensityMetric(self.location).calculate(context)
+        sb_score = SchoolBusinessMetric(self.location).calculate(context)
         return round(0.4 * pop_score + 0.6 * sb_score, 2)
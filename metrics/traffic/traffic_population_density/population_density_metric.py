@@ -2,6 +2,6 @@ class PopulationDensityMetric:
     def __init__(self, location):
         self.location = location
 
-    def calculate(self):
+    def calculate(self, context=None):
         # Simulated static score
         return 0.75
@@ -17,13 +17,18 @@ class Place(BaseModel):
     user_ratings_total: Optional[int] = None
     price_level: Optional[str] = None
     place_id: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class QueryInfo(BaseModel):
     location: str
     radius_meters: int
     place_types: List[str]
     timestamp: datetime
+    latitude: Optional[float] = Field(default=None, description="Geocoded search centre, when known")
+    longitude: Optional[float] = Field(default=None, description="Geocoded search centre, when known")
 
 class ProximitySearchResponse(BaseModel):
     query_info: QueryInfo
-    results: Dict[str, List[Place]]
\ No newline at end of file
+    results: Dict[str, List[Place]]
+    errors: Dict[str, str] = Field(default_factory=dict, description="Place types whose search failed, with the error")
@@ -1,7 +1,17 @@
-import httpx
-from typing import List, Dict
+import asyncio
+import logging
+import re
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
 
+import httpx
+
+from utils.http_clients import HttpClientRegistry, upstream_url
+from utils.places_cache import PlacesSearchCache
+from utils.places_fields import field_mask, profile_fields
+from utils.place_store import PlaceStore
+from utils.resilience import ResilienceRegistry
+
 from ..models.proximity_models import (
     ProximitySearchRequest,
     ProximitySearchResponse,
@@ -9,36 +19,221 @@ from ..models.proximity_models import (
     QueryInfo,
 )
 
+logger = logging.getLogger(__name__)
+
 class ProximityService:
-    """Async wrapper for Google Places API text search, supporting multiple place types."""
+    """
+    Async wrapper for Google Places API searches around a location, supporting
+    multiple place types.
+
+    The location is geocoded once and every requested type is fetched with a
+    single Nearby Search restricted to a `radius_meters` circle, then split by
+    type locally; when that shared search fills up, each type gets its own.
+    Searches that Nearby Search cannot answer (free-text types, `open_now`,
+    or an upstream error) fall back to one concurrent text search per type.
+    """
 
-    SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+    SEARCH_URL = upstream_url("google_places", "/v1/places:searchText")
+    NEARBY_URL = upstream_url("google_places", "/v1/places:searchNearby")
+    FIELD_PROFILE = "summary"
+    # Nearby Search returns at most 20 places per request, without paging
+    NEARBY_MAX_RESULTS = 20
+    # Google place types are lowercase snake_case, e.g. "primary_school"
+    PLACE_TYPE_PATTERN = re.compile(r"^[a-z][a-z0-9_]*$")
+    COORDINATES_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        http_clients: Optional[HttpClientRegistry] = None,
+        places_cache: Optional[PlacesSearchCache] = None,
+        place_store: Optional[PlaceStore] = None,
+        resilience: Optional[ResilienceRegistry] = None,
+        concurrency: int = 4,
+    ):
         self.api_key = api_key
+        self.http_clients = http_clients or HttpClientRegistry()
+        self.places_cache = places_cache
+        self.place_store = place_store
+        self.resilience = resilience or ResilienceRegistry()
+        self.concurrency = max(1, concurrency)
 
     async def search(self, request: ProximitySearchRequest) -> ProximitySearchResponse:
         place_types = [p.strip() for p in request.place_types.split(",") if p.strip()]
-        results: Dict[str, List[Place]] = {}
 
-        for place_type in place_types:
-            text_query = f"{place_type} in {request.location}"
-            places_data = await self._search_places(
-                text_query=text_query,
-                max_results=request.max_results,
-                min_rating=request.min_rating,
-                open_now=request.open_now,
-            )
-            results[place_type] = [self._parse_place(p) for p in places_data]
+        results = errors = None
+        center: Tuple[Optional[float], Optional[float]] = (None, None)
+        if self._nearby_supported(request, place_types):
+            try:
+                center = await self._geocode(request.location)
+                results, errors = await self._search_nearby(request, place_types, center)
+            except Exception as e:
+                logger.info("Nearby search for %s failed, falling back to text search: %s", place_types, e)
+        if results is None:
+            results, errors = await self._search_by_type(request, place_types)
 
         query_info = QueryInfo(
             location=request.location,
             radius_meters=request.radius_meters,
             place_types=place_types,
             timestamp=datetime.now(),
+            latitude=center[0],
+            longitude=center[1],
+        )
+
+        return ProximitySearchResponse(query_info=query_info, results=results, errors=errors)
+
+    def _nearby_supported(self, request: ProximitySearchRequest, place_types: List[str]) -> bool:
+        # Nearby Search has no openNow filter and only accepts Google place types
+        return bool(place_types) and not request.open_now and all(
+            self.PLACE_TYPE_PATTERN.match(place_type) for place_type in place_types
         )
 
-        return ProximitySearchResponse(query_info=query_info, results=results)
+    async def _search_nearby(
+        self, request: ProximitySearchRequest, place_types: List[str], center: Tuple[float, float]
+    ) -> Tuple[Dict[str, List[Place]], Dict[str, str]]:
+        """
+        Nearby Search within the radius around `center`, split by type locally.
+
+        All types first share one request for `max_results` places per type
+        (at most 20 in total, the Nearby Search cap). When that combined
+        result comes back with as many places as were asked for, the common
+        types may have crowded out the rare ones; each type is then searched
+        on its own, concurrently, with its own `max_results` (at most 20,
+        which the request model already enforces).
+        """
+        requested = min(request.max_results * len(place_types), self.NEARBY_MAX_RESULTS)
+        combined = await self._nearby(place_types, requested, center, request.radius_meters)
+        if len(place_types) == 1 or len(combined) < requested:
+            outcomes: List = self._split_by_type(combined, place_types, request)
+        else:
+            logger.info("Nearby search for %s returned all %d places requested; searching each type separately",
+                        place_types, requested)
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def search_type(place_type: str) -> List[Dict]:
+                async with semaphore:
+                    return await self._nearby(
+                        [place_type], min(request.max_results, self.NEARBY_MAX_RESULTS),
+                        center, request.radius_meters,
+                    )
+
+            fetched = await asyncio.gather(
+                *(search_type(place_type) for place_type in place_types), return_exceptions=True
+            )
+            outcomes = [
+                result if isinstance(result, BaseException)
+                else self._split_by_type(result, [place_type], request)[0]
+                for place_type, result in zip(place_types, fetched)
+            ]
+
+        return self._collect_results(place_types, outcomes)
+
+    async def _nearby(
+        self, place_types: List[str], max_count: int, center: Tuple[float, float], radius_meters: int
+    ) -> List[Dict]:
+        """One cached Nearby Search for `place_types` inside the circle."""
+        latitude, longitude = center
+        headers = self._headers(field_mask(self.FIELD_PROFILE))
+        payload = {
+            "includedTypes": place_types,
+            "maxResultCount": max_count,
+            "locationRestriction": {"circle": {
+                "center": {"latitude": latitude, "longitude": longitude},
+                "radius": float(radius_meters),
+            }},
+        }
+
+        async def fetch() -> List[Dict]:
+            places = (await self._post(self.NEARBY_URL, headers, payload)).get("places", [])
+            if self.place_store:
+                for place_type in place_types:
+                    self.place_store.observe(
+                        [place for place in places if place_type in place.get("types", [])], place_type
+                    )
+            return places
+
+        cache_query = f"nearby:{','.join(place_types)}@{latitude:.6f},{longitude:.6f},{radius_meters}"
+        return await self._cached(cache_query, max_count, 0.0, False, headers["X-Goog-FieldMask"], fetch)
+
+    @staticmethod
+    def _split_by_type(
+        places: List[Dict], place_types: List[str], request: ProximitySearchRequest
+    ) -> List[List[Dict]]:
+        # Each place goes to the first requested type it has; rating is filtered
+        # here because Nearby Search has no minRating parameter
+        by_type: Dict[str, List[Dict]] = {place_type: [] for place_type in place_types}
+        for place in places:
+            if request.min_rating and (place.get("rating") or 0.0) < request.min_rating:
+                continue
+            place_type = next((t for t in place_types if t in place.get("types", [])), None)
+            if place_type and len(by_type[place_type]) < request.max_results:
+                by_type[place_type].append(place)
+        return [by_type[place_type] for place_type in place_types]
+
+    async def _geocode(self, location: str) -> Tuple[float, float]:
+        """Resolve a location description to coordinates with an ids-and-location text search."""
+        coordinates = self.COORDINATES_PATTERN.match(location)
+        if coordinates:
+            # Already "lat,lng": nothing to geocode
+            return float(coordinates.group(1)), float(coordinates.group(2))
+        headers = self._headers("places.location")
+        payload = {"textQuery": location, "pageSize": 1}
+
+        async def fetch() -> List[Dict]:
+            return (await self._post(self.SEARCH_URL, headers, payload)).get("places", [])
+
+        places = await self._cached(location, 1, 0.0, False, headers["X-Goog-FieldMask"], fetch)
+        if not places or "location" not in places[0]:
+            raise ValueError(f"Could not geocode location '{location}'")
+        coordinates = places[0]["location"]
+        return coordinates["latitude"], coordinates["longitude"]
+
+    async def _search_by_type(
+        self, request: ProximitySearchRequest, place_types: List[str]
+    ) -> Tuple[Dict[str, List[Place]], Dict[str, str]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def search_type(place_type: str) -> List[Dict]:
+            async with semaphore:
+                return await self._search_places(
+                    text_query=f"{place_type} in {request.location}",
+                    max_results=request.max_results,
+                    min_rating=request.min_rating,
+                    open_now=request.open_now,
+                    category=place_type,
+                )
+
+        # All types are searched concurrently; a failed type becomes an entry
+        # in `errors` instead of failing the whole search
+        outcomes = await asyncio.gather(
+            *(search_type(place_type) for place_type in place_types), return_exceptions=True
+        )
+        return self._collect_results(place_types, outcomes)
+
+    def _collect_results(
+        self, place_types: List[str], outcomes: List
+    ) -> Tuple[Dict[str, List[Place]], Dict[str, str]]:
+        """Parse per-type outcomes in request order; a place is listed under the first type that found it."""
+        results: Dict[str, List[Place]] = {}
+        errors: Dict[str, str] = {}
+        seen: Set[str] = set()
+        for place_type, outcome in zip(place_types, outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            if isinstance(outcome, Exception):
+                logger.warning("Proximity search for %s failed: %s", place_type, outcome)
+                errors[place_type] = str(outcome) or type(outcome).__name__
+                continue
+            places = []
+            for place_data in outcome:
+                place = self._parse_place(place_data)
+                if place.place_id and place.place_id in seen:
+                    continue
+                seen.add(place.place_id)
+                places.append(place)
+            results[place_type] = places
+        return results, errors
 
     async def _search_places(
         self,
@@ -47,25 +242,54 @@ class ProximityService:
         max_results: int,
         min_rating: float,
         open_now: bool,
+        category: Optional[str] = None,
     ) -> List[Dict]:
-        headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.priceLevel,places.id",
-        }
+        headers = self._headers(field_mask(self.FIELD_PROFILE))
         payload = {
             "textQuery": text_query,
             "pageSize": min(max_results, 20),
             "minRating": min_rating,
             "openNow": open_now,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.SEARCH_URL, headers=headers, json=payload, timeout=15)
+
+        async def fetch() -> List[Dict]:
+            places = (await self._post(self.SEARCH_URL, headers, payload)).get("places", [])
+            if self.place_store:
+                self.place_store.observe(places, category)
+            return places
+
+        return await self._cached(
+            text_query, payload["pageSize"], min_rating, open_now, headers["X-Goog-FieldMask"], fetch
+        )
+
+    def _headers(self, mask: str) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": self.api_key,
+            "X-Goog-FieldMask": mask,
+        }
+
+    async def _post(self, url: str, headers: Dict[str, str], payload: Dict) -> Dict:
+        client = self.http_clients.get("google_places")
+
+        async def send() -> httpx.Response:
+            response = await client.post(url, headers=headers, json=payload)
             response.raise_for_status()
-            return response.json().get("places", [])
+            return response
 
-    @staticmethod
-    def _parse_place(place: Dict) -> Place:
+        response = await self.resilience.get("google_places").call(send)
+        return response.json()
+
+    async def _cached(
+        self, query: str, page_size: int, min_rating: float, open_now: bool, mask: str, fetch
+    ) -> List[Dict]:
+        if not self.places_cache:
+            return await fetch()
+        cache_key = PlacesSearchCache.make_key(query, page_size, min_rating, open_now, mask)
+        return await self.places_cache.get_or_fetch(cache_key, fetch)
+
+    @classmethod
+    def _parse_place(cls, place: Dict) -> Place:
         mapping = {
             "PRICE_LEVEL_FREE": "Free",
             "PRICE_LEVEL_INEXPENSIVE": "$",
@@ -73,11 +297,19 @@ class ProximityService:
             "PRICE_LEVEL_EXPENSIVE": "$$$",
             "PRICE_LEVEL_VERY_EXPENSIVE": "$$$$",
         }
-        return Place(
-            name=place.get("displayName", {}).get("text", "Unknown"),
-            address=place.get("formattedAddress", ""),
-            rating=place.get("rating"),
-            user_ratings_total=place.get("userRatingCount"),
-            price_level=mapping.get(place.get("priceLevel"), "Unknown"),
-            place_id=place.get("id", ""),
-        )
\ No newline at end of file
+        fields = profile_fields(cls.FIELD_PROFILE)
+        values = {
+            "name": place.get("displayName", {}).get("text", "Unknown"),
+            "address": place.get("formattedAddress", ""),
+            "place_id": place.get("id", ""),
+        }
+        if "rating" in fields:
+            values["rating"] = place.get("rating")
+        if "userRatingCount" in fields:
+            values["user_ratings_total"] = place.get("userRatingCount")
+        if "priceLevel" in fields:
+            values["price_level"] = mapping.get(place.get("priceLevel"), "Unknown")
+        if "location" in fields and "location" in place:
+            values["latitude"] = place["location"].get("latitude")
+            values["longitude"] = place["location"].get("longitude")
+        return Place(**values)
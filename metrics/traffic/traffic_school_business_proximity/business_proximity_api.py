@@ -3,7 +3,8 @@ internal metric computations.
 
 The wrapper keeps a singleton `ProximityService` instance initialised with the
 `GOOGLE_PLACES_API_KEY` from the environment and exposes both asynchronous and
-synchronous call helpers.
+synchronous call helpers, plus batch variants that run many lookups
+concurrently. All of them execute on one long-lived background event loop.
 
 Example
 -------
@@ -19,27 +20,61 @@ from __future__ import annotations
 
 import asyncio
 import os
+import threading
 from typing import Any
 
 from dotenv import load_dotenv
 
 # Import the service & models from the previously created business_proximity package.
-import os
-import httpx
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional
 from dotenv import load_dotenv
 from datetime import datetime
 
+from metrics.traffic.traffic_school_business_proximity.business_proximity.models.proximity_models import (
+    ProximitySearchRequest,
+    ProximitySearchResponse,
+)
+from metrics.traffic.traffic_school_business_proximity.business_proximity.services.proximity_service import ProximityService
+from utils.async_bridge import BackgroundLoop
+from utils.http_clients import HttpClientRegistry, upstream_url
+from utils.places_cache import PlacesSearchCache
+from utils.places_fields import field_mask
+from utils.place_store import PlaceStore
+from utils.resilience import CircuitOpenError, ResilienceRegistry, blocking_timeout
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 if not GOOGLE_API_KEY:
     raise RuntimeError("GOOGLE_PLACES_API_KEY not set in environment or .env file")
 
-app = FastAPI(title="Business Proximity API", version="1.0.0")
+# Pooled HTTP clients for the API endpoints, closed when the app shuts down
+http_clients = HttpClientRegistry()
+
+# Places text-search cache, configured through PLACES_CACHE_* environment variables
+places_cache = PlacesSearchCache.from_env()
+
+# Local spatial store of observed places, configured through PLACE_STORE_* environment variables
+place_store = PlaceStore.from_env()
+
+# Circuit breakers, retries and hedging for upstream calls
+resilience = ResilienceRegistry.from_env()
+
+# How many place types of one request are searched at the same time
+TYPE_CONCURRENCY = int(os.getenv("PROXIMITY_TYPE_CONCURRENCY", "4"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_clients.aclose()
+    places_cache.close()
+    place_store.close()
+
+app = FastAPI(title="Business Proximity API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -79,6 +114,7 @@ class DeepAnalysis(BaseModel):
 class BusinessProximityResponse(BaseModel):
     query_info: QueryInfo
     results: Dict[str, List[Place]]
+    errors: Dict[str, str] = Field(default_factory=dict)
     deep_analysis: Optional[DeepAnalysis] = None
 
 def parse_price_level(price_level: str) -> str:
@@ -91,46 +127,83 @@ def parse_price_level(price_level: str) -> str:
     }
     return mapping.get(price_level, "Unknown")
 
-async def search_places(text_query: str, max_results: int, min_rating: float) -> List[dict]:
-    url = "https://places.googleapis.com/v1/places:searchText"
+async def search_places(text_query: str, max_results: int, min_rating: float, category: Optional[str] = None) -> List[dict]:
+    url = upstream_url("google_places", "/v1/places:searchText")
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": GOOGLE_API_KEY,
-        "X-Goog-FieldMask": "places.displayName,places.formattedAddress,places.rating,places.userRatingCount,places.priceLevel,places.id",
+        "X-Goog-FieldMask": field_mask("summary"),
     }
     payload = {
         "textQuery": text_query,
         "pageSize": min(max_results, 20),
         "minRating": min_rating,
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers, json=payload, timeout=15)
-        resp.raise_for_status()
-        return resp.json().get("places", [])
+
+    async def fetch() -> List[dict]:
+        client = http_clients.get("google_places")
+
+        async def send():
+            resp = await client.post(url, headers=headers, json=payload)
+            resp.raise_for_status()
+            return resp
+
+        resp = await resilience.get("google_places").call(send)
+        places = resp.json().get("places", [])
+        place_store.observe(places, category)
+        return places
+
+    cache_key = PlacesSearchCache.make_key(
+        text_query, payload["pageSize"], min_rating, False, headers["X-Goog-FieldMask"]
+    )
+    return await places_cache.get_or_fetch(cache_key, fetch)
 
 @app.post("/api/v1/business-proximity/analyze", response_model=BusinessProximityResponse)
 async def analyze_business_proximity(body: BusinessProximityRequest):
     place_types = [p.strip() for p in body.places_type.split(",") if p.strip()]
+    semaphore = asyncio.Semaphore(TYPE_CONCURRENCY)
+
+    async def search_type(place_type: str) -> List[dict]:
+        async with semaphore:
+            return await search_places(f"{place_type} in {body.location}", body.max_results, body.min_rating, place_type)
+
+    # Types are searched concurrently; a failed type is reported in `errors`
+    outcomes = await asyncio.gather(*(search_type(t) for t in place_types), return_exceptions=True)
+
     all_results: Dict[str, List[Place]] = {}
+    errors: Dict[str, str] = {}
     all_ratings: List[float] = []
-    for place_type in place_types:
-        text_query = f"{place_type} in {body.location}"
-        try:
-            places_data = await search_places(text_query, body.max_results, body.min_rating)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Google Places API error: {e}")
-        places = [
-            Place(
+    seen_ids = set()
+    for place_type, outcome in zip(place_types, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, Exception):
+            errors[place_type] = f"Google Places API error: {outcome}"
+            continue
+        places = []
+        for p in outcome:
+            # A place matching several types is listed under the first one only
+            place_id = p.get("id", "")
+            if place_id and place_id in seen_ids:
+                continue
+            seen_ids.add(place_id)
+            places.append(Place(
                 name=p.get("displayName", {}).get("text", "Unknown"),
                 address=p.get("formattedAddress", ""),
                 rating=p.get("rating"),
                 user_ratings_total=p.get("userRatingCount"),
                 price_level=parse_price_level(p.get("priceLevel")),
-                place_id=p.get("id", ""),
-            ) for p in places_data
-        ]
+                place_id=place_id,
+            ))
         all_results[place_type] = places
         all_ratings.extend([pl.rating for pl in places if pl.rating is not None])
+
+    if place_types and len(errors) == len(place_types):
+        # Nothing succeeded: report the failure as a whole
+        if all(isinstance(outcome, CircuitOpenError) for outcome in outcomes):
+            raise HTTPException(status_code=503, detail="Google Places API unavailable: circuit open")
+        raise HTTPException(status_code=502, detail=next(iter(errors.values())))
+
     query_info = QueryInfo(
         location=body.location,
         place_types=place_types,
@@ -145,9 +218,18 @@ async def analyze_business_proximity(body: BusinessProximityRequest):
     return BusinessProximityResponse(
         query_info=query_info,
         results=all_results,
+        errors=errors,
         deep_analysis=deep_analysis,
     )
 
+@app.get("/api/v1/business-proximity/metrics")
+async def get_metrics():
+    return {
+        "places_cache": places_cache.stats(),
+        "place_store": place_store.stats(),
+        "resilience": resilience.stats(),
+    }
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
@@ -159,17 +241,60 @@ if __name__ == "__main__":
 # Ensure .env variables are loaded when running outside of the FastAPI context
 load_dotenv()
 
-# Singleton service instance so we don't recreate an httpx client for every call
+# Singleton service instance so we don't recreate an httpx client for every
+# call. Its pooled clients belong to `_bridge`'s loop, so the service is built
+# and used only on the bridge; it shares the module's cache, store and
+# circuit breakers with the API endpoints.
 _service: ProximityService | None = None
+_service_lock = threading.Lock()
+_bridge = BackgroundLoop(name="business-proximity")
 
 def _get_service() -> ProximityService:
     global _service
-    if _service is None:
-        api_key = os.getenv("GOOGLE_PLACES_API_KEY")
-        if not api_key:
-            raise RuntimeError("GOOGLE_PLACES_API_KEY is not set in environment")
-        _service = ProximityService(api_key=api_key)
-    return _service
+    with _service_lock:
+        if _service is None:
+            _service = ProximityService(
+                api_key=GOOGLE_API_KEY,
+                places_cache=places_cache,
+                place_store=place_store,
+                resilience=resilience,
+                concurrency=TYPE_CONCURRENCY,
+            )
+        return _service
+
+
+async def _search_one(request: ProximitySearchRequest) -> ProximitySearchResponse:
+    return await _get_service().search(request)
+
+
+def _build_request(
+    *,
+    place_types: str,
+    location: str,
+    radius_meters: int = 2000,
+    max_results: int = 10,
+    min_rating: float = 0.0,
+    open_now: bool = False,
+) -> ProximitySearchRequest:
+    return ProximitySearchRequest(
+        place_types=place_types,
+        location=location,
+        radius_meters=radius_meters,
+        max_results=max_results,
+        min_rating=min_rating,
+        open_now=open_now,
+    )
+
+
+async def _search_many(requests: List[ProximitySearchRequest], concurrency: int, return_exceptions: bool) -> List[Any]:
+    service = _get_service()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def search(request: ProximitySearchRequest) -> ProximitySearchResponse:
+        async with semaphore:
+            return await service.search(request)
+
+    return await asyncio.gather(*(search(r) for r in requests), return_exceptions=return_exceptions)
 
 
 async def fetch_business_proximity(
@@ -184,8 +309,10 @@ async def fetch_business_proximity(
     """Async helper returning a `ProximitySearchResponse`.
 
     Parameters mirror the fields of `ProximitySearchRequest` for convenience.
+    Safe to await from any event loop: the search runs on the shared
+    background loop that owns the service's pooled clients.
     """
-    request = ProximitySearchRequest(
+    request = _build_request(
         place_types=place_types,
         location=location,
         radius_meters=radius_meters,
@@ -193,9 +320,23 @@ async def fetch_business_proximity(
         min_rating=min_rating,
         open_now=open_now,
     )
+    return await _bridge.run_async(_search_one(request))
 
-    service = _get_service()
-    return await service.search(request)
+
+async def fetch_business_proximity_many(
+    queries: Iterable[Dict[str, Any]],
+    *,
+    concurrency: int = 8,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """Async batch helper: run many lookups concurrently, results in input order.
+
+    Each query is a dict of `fetch_business_proximity` keyword arguments.
+    With `return_exceptions=True` a failed lookup yields its exception in
+    place of a response instead of failing the whole batch.
+    """
+    requests = [_build_request(**query) for query in queries]
+    return await _bridge.run_async(_search_many(requests, concurrency, return_exceptions))
 
 
 def get_business_proximity(
@@ -206,13 +347,18 @@ def get_business_proximity(
     max_results: int = 10,
     min_rating: float = 0.0,
     open_now: bool = False,
-    loop: asyncio.AbstractEventLoop | None = None,
+    timeout: float | None = None,
 ) -> ProximitySearchResponse:
     """Sync wrapper around :pyfunc:`fetch_business_proximity` for ease of use.
 
-    If no running event-loop is detected, one is created temporarily.
+    The search runs on a long-lived background event loop, so connections
+    and cached lookups are reused across calls. Works from plain sync code
+    and from threads that are themselves running an event loop (the caller
+    blocks; async code should prefer awaiting `fetch_business_proximity`).
+    Inside a `utils.resilience.deadline` the wait, and the search itself,
+    are cut off when the deadline passes.
     """
-    coro = fetch_business_proximity(
+    request = _build_request(
         place_types=place_types,
         location=location,
         radius_meters=radius_meters,
@@ -220,13 +366,22 @@ def get_business_proximity(
         min_rating=min_rating,
         open_now=open_now,
     )
-    try:
-        loop = loop or asyncio.get_event_loop()
-    except RuntimeError:
-        loop = None
-
-    if loop and loop.is_running():
-        # If we're already inside an asyncio context, schedule and wait.
-        return asyncio.run_coroutine_threadsafe(coro, loop).result()
-    else:
-        return asyncio.run(coro)
+    return _bridge.run(_search_one(request), blocking_timeout(timeout))
+
+
+def get_business_proximity_many(
+    queries: Iterable[Dict[str, Any]],
+    *,
+    concurrency: int = 8,
+    return_exceptions: bool = False,
+    timeout: float | None = None,
+) -> List[Any]:
+    """Sync batch helper: run many lookups concurrently on the background loop.
+
+    >>> responses = get_business_proximity_many([
+    ...     {"place_types": "school", "location": "Centretown Ottawa"},
+    ...     {"place_types": "school", "location": "The Glebe Ottawa"},
+    ... ])
+    """
+    requests = [_build_request(**query) for query in queries]
+    return _bridge.run(_search_many(requests, concurrency, return_exceptions), blocking_timeout(timeout))
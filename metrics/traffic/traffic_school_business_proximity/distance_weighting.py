@@ -1,3 +1,9 @@
+import numpy as np
+
+# Distance at which a single place counts half as much as one right next door
+HALF_WEIGHT_DISTANCE_M = 400.0
+
+
 def get_distance_score(distance_m):
     if distance_m < 200:
         return 1.0
@@ -7,3 +13,23 @@ def get_distance_score(distance_m):
         return 0.5
     else:
         return 0.2
+
+
+def distance_decay(distances_m, half_distance_m=HALF_WEIGHT_DISTANCE_M):
+    """Continuous replacement for `get_distance_score`: 1 at 0 m, halving every `half_distance_m`."""
+    return np.exp(-np.log(2) * np.asarray(distances_m, dtype=float) / half_distance_m)
+
+
+def proximity_scores(distances_m, sites, site_count, saturation=3.0, half_distance_m=HALF_WEIGHT_DISTANCE_M):
+    """
+    Aggregate site-to-place distances into one score per site in [0, 1).
+
+    `distances_m[i]` is the distance from site `sites[i]` to one place found
+    around it, so the cost is linear in the places found rather than sites x
+    places. Every place contributes its decayed weight; the sum saturates so
+    that `saturation` places right next to the site give a score of ~0.63 and
+    many close places approach 1. Sites with no places score 0.
+    """
+    weights = distance_decay(distances_m, half_distance_m)
+    totals = np.bincount(np.asarray(sites, dtype=np.intp), weights=weights, minlength=site_count)
+    return 1.0 - np.exp(-totals / saturation)
@@ -1,12 +1,134 @@
-from metrics.traffic.traffic_school_business_proximity.distance_weighting import get_distance_score
+import numpy as np
+
+from engine.location_validator import parse_coordinates
+from metrics.traffic.traffic_school_business_proximity.distance_weighting import proximity_scores
+from utils.geo import haversine_m
+
+
+def _default_proximity_lookup(queries, return_exceptions=False):
+    # Imported lazily: the proximity API module needs GOOGLE_PLACES_API_KEY at import time
+    from metrics.traffic.traffic_school_business_proximity.business_proximity_api import get_business_proximity_many
+    return get_business_proximity_many(queries, return_exceptions=return_exceptions)
+
 
 class SchoolBusinessMetric:
-    def __init__(self, location):
+    """
+    Foot-traffic proxy from how close a site is to schools and businesses.
+
+    Nearby places come from the proximity service. The distances from each
+    site to the places its own searches returned are computed in one
+    vectorized haversine pass, and each place contributes a continuously
+    decaying weight (see distance_weighting).
+    """
+
+    SCHOOL_TYPES = "school,university"
+    BUSINESS_TYPES = "store,restaurant,cafe"
+    RADIUS_METERS = 1500
+    # Decayed place counts at which each category's score reaches ~0.63;
+    # businesses are far more common than schools
+    SCHOOL_SATURATION = 2.0
+    BUSINESS_SATURATION = 10.0
+
+    def __init__(self, location, proximity_lookup=None):
         self.location = location
+        self.proximity_lookup = proximity_lookup
+
+    def calculate(self, context=None):
+        if context is None:
+            location, lookup = self.location, self.proximity_lookup
+        else:
+            # Reuse the context's geocode and place searches shared with the other metrics
+            location = context.coordinates() or self.location
+            lookup = self.proximity_lookup or context.proximity_lookup
+        scores, errors = self._score_sites([location], lookup, self.RADIUS_METERS)
+        if errors[0] is not None:
+            # Every search failed: report the failure instead of a misleading 0.0
+            raise errors[0]
+        return float(scores[0])
+
+    @classmethod
+    def calculate_many(cls, locations, proximity_lookup=None, radius_meters=RADIUS_METERS):
+        """
+        Score many sites at once; returns a numpy array aligned with `locations`.
+
+        Each location is an address, a "lat,lng" string or a (lat, lng) pair.
+        Each site only counts the places its own searches returned, so a site
+        scores the same however it is batched. Sites whose searches all
+        failed score NaN rather than 0.
+        """
+        return cls._score_sites(list(locations), proximity_lookup, radius_meters)[0]
+
+    @classmethod
+    def _score_sites(cls, locations, proximity_lookup, radius_meters):
+        # (scores, errors): errors[i] is the exception of site i when all its searches failed
+        if not locations:
+            return np.zeros(0), []
+        lookup = proximity_lookup or _default_proximity_lookup
+        queries = []
+        for location in locations:
+            coordinates = parse_coordinates(location)
+            text = f"{coordinates[0]},{coordinates[1]}" if coordinates else str(location)
+            for place_types in (cls.SCHOOL_TYPES, cls.BUSINESS_TYPES):
+                queries.append({
+                    "place_types": place_types,
+                    "location": text,
+                    "radius_meters": radius_meters,
+                    "max_results": 20,
+                })
+        responses = lookup(queries, return_exceptions=True)
+
+        # Ragged (site index, lat, lng) rows: one per place a site's own search found
+        schools, businesses = [], []
+        errors = [None] * len(locations)
+        site_lats = np.full(len(locations), np.nan)
+        site_lngs = np.full(len(locations), np.nan)
+        for index, location in enumerate(locations):
+            site_responses = responses[2 * index:2 * index + 2]
+            failures = [response for response in site_responses if isinstance(response, Exception)]
+            if len(failures) == len(site_responses):
+                errors[index] = failures[0]
+                continue
+            own_places = []
+            for response, found in zip(site_responses, (schools, businesses)):
+                if isinstance(response, Exception):
+                    continue
+                seen = set()
+                for places in response.results.values():
+                    for place in places:
+                        if place.latitude is None or place.longitude is None or place.place_id in seen:
+                            continue
+                        seen.add(place.place_id)
+                        found.append((index, place.latitude, place.longitude))
+                        own_places.append((place.latitude, place.longitude))
+            site_lats[index], site_lngs[index] = cls._site_coordinates(location, site_responses, own_places)
+
+        scores = 0.5 * cls._category_scores(site_lats, site_lngs, schools, cls.SCHOOL_SATURATION, radius_meters) \
+            + 0.5 * cls._category_scores(site_lats, site_lngs, businesses, cls.BUSINESS_SATURATION, radius_meters)
+        failed = np.array([error is not None for error in errors])
+        # Sites that could not be located at all score 0; failed lookups stay NaN
+        scores = np.where(failed, np.nan, np.nan_to_num(scores, nan=0.0))
+        return np.round(scores, 2), errors
+
+    @staticmethod
+    def _site_coordinates(location, site_responses, own_places):
+        coordinates = parse_coordinates(location)
+        if coordinates:
+            return coordinates
+        for response in site_responses:
+            if not isinstance(response, Exception) and response.query_info.latitude is not None:
+                return response.query_info.latitude, response.query_info.longitude
+        if own_places:
+            # No geocoded centre (text-search fallback): use the centroid of what was found
+            return tuple(np.mean(np.asarray(own_places), axis=0))
+        return np.nan, np.nan
 
-    def calculate(self):
-        school_distance = 350
-        business_distance = 600
-        school_score = get_distance_score(school_distance)
-        business_score = get_distance_score(business_distance)
-        return round(0.5 * school_score + 0.5 * business_score, 2)
+    @staticmethod
+    def _category_scores(site_lats, site_lngs, found, saturation, radius_meters):
+        if not found:
+            return np.zeros(len(site_lats))
+        rows = np.asarray(found, dtype=float)
+        sites = rows[:, 0].astype(np.intp)
+        distances = haversine_m(site_lats[sites], site_lngs[sites], rows[:, 1], rows[:, 2])
+        # Places outside a site's search radius contribute nothing to it
+        distances[~(distances <= radius_meters)] = np.inf
+        return proximity_scores(distances, sites, len(site_lats), saturation)
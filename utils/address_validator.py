@@ -1,5 +1,6 @@
 import requests
 import json
+import os
 import time
 from typing import Optional, Dict, Tuple
 
@@ -17,7 +18,10 @@ class AddressValidator:
             api_key (str, optional): API key for premium geocoding services
         """
         self.api_key = api_key
-        self.base_url = "https://nominatim.openstreetmap.org/search"
+        # Seconds to wait for Nominatim; callers under a deadline may shorten it
+        self.timeout = 10.0
+        # NOMINATIM_BASE_URL lets tests and load tests point at a local emulator
+        self.base_url = os.getenv("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org").rstrip("/") + "/search"
         self.headers = {
             'User-Agent': 'BusinessVenueAnalyzer/1.0 (https://github.com/your-repo)'
         }
@@ -46,7 +50,7 @@ class AddressValidator:
                 self.base_url,
                 params=params,
                 headers=self.headers,
-                timeout=10
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
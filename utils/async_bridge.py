@@ -0,0 +1,92 @@
+"""
+Run async service code from synchronous callers on one long-lived event loop.
+
+``asyncio.run`` creates and tears down a loop on every call, which throws
+away pooled ``httpx`` connections and any loop-bound state such as in-flight
+cache futures. ``BackgroundLoop`` instead owns a daemon thread running a
+single event loop for the life of the process; sync code submits coroutines
+to it and blocks on the result, and async code running on *another* loop can
+await them without touching clients bound to the background loop.
+
+Example:
+    >>> bridge = BackgroundLoop(name="proximity")
+    >>> response = bridge.run(service.search(request))          # sync caller
+    >>> response = await bridge.run_async(service.search(request))  # async caller
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """A lazily started event loop running forever in a daemon thread."""
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop, ready), name=self.name, daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """Schedule ``coro`` on the background loop and return a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run ``coro`` on the background loop and block until it finishes."""
+        if self._on_loop_thread():
+            coro.close()
+            raise RuntimeError(f"{self.name}: cannot block on the background loop from its own thread")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def run_async(self, coro: Coroutine[Any, Any, T]) -> Awaitable[T]:
+        """Run ``coro`` on the background loop and await it from the caller's loop."""
+        if self._on_loop_thread():
+            return coro
+        return asyncio.wrap_future(self.submit(coro))
+
+    def close(self) -> None:
+        """Stop the loop and wait for its thread; a later call starts a fresh one."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+
+    def _on_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
@@ -0,0 +1,20 @@
+"""
+Great-circle distance shared by the place store, the parking index and the
+proximity metrics.
+
+``haversine_m`` works on plain floats and on numpy arrays alike: array
+arguments broadcast, so ``haversine_m(lats[:, None], lngs[:, None],
+poi_lats[None, :], poi_lngs[None, :])`` is a (sites, places) distance matrix.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between points given in degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,115 @@
+"""
+Shared pooled ``httpx.AsyncClient`` instances for the upstream APIs we call.
+
+Opening a new ``AsyncClient`` per request throws away the connection pool and
+repeats the TCP/TLS handshake every time. ``HttpClientRegistry`` keeps one
+long-lived client per upstream (Google Places, Tavily, ...) with its own pool
+limits, keep-alive expiry and timeouts, and negotiates HTTP/2 when the ``h2``
+package is installed.
+
+Each FastAPI app owns one registry and closes it from its lifespan handler:
+
+    >>> http_clients = HttpClientRegistry()
+    >>> @asynccontextmanager
+    ... async def lifespan(app):
+    ...     yield
+    ...     await http_clients.aclose()
+"""
+from __future__ import annotations
+
+import importlib.util
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+# HTTP/2 support in httpx is an optional extra (``pip install httpx[http2]``).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    """Connection-pool and timeout settings for a single upstream API."""
+
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    write_timeout: float = 5.0
+    pool_timeout: float = 5.0
+    http2: bool = True
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+# Default settings per upstream. Places is our highest-volume upstream, Tavily
+# searches are slower and rate limited, Nominatim asks for at most a couple of
+# connections per client.
+DEFAULT_UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "google_places": UpstreamConfig(max_connections=100, max_keepalive_connections=40, read_timeout=15.0),
+    "tavily": UpstreamConfig(max_connections=20, max_keepalive_connections=10, read_timeout=30.0),
+    "nominatim": UpstreamConfig(max_connections=2, max_keepalive_connections=2, read_timeout=10.0, http2=False),
+    "google_maps": UpstreamConfig(max_connections=50, max_keepalive_connections=20, read_timeout=10.0),
+}
+
+FALLBACK_UPSTREAM = UpstreamConfig()
+
+# Public base URL of each upstream. Each can be overridden through an
+# environment variable, e.g. to point the services at the local emulators in
+# ``loadtest/emulators.py``.
+UPSTREAM_BASE_URLS: Dict[str, Tuple[str, str]] = {
+    "google_places": ("GOOGLE_PLACES_BASE_URL", "https://places.googleapis.com"),
+    "tavily": ("TAVILY_BASE_URL", "https://api.tavily.com"),
+    "nominatim": ("NOMINATIM_BASE_URL", "https://nominatim.openstreetmap.org"),
+    "google_maps": ("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com"),
+}
+
+
+def upstream_url(upstream: str, path: str) -> str:
+    """Return the absolute URL of ``path`` on ``upstream``, honouring env overrides."""
+    env_var, default = UPSTREAM_BASE_URLS[upstream]
+    return (os.getenv(env_var) or default).rstrip("/") + path
+
+
+class HttpClientRegistry:
+    """Lazily creates and caches one ``httpx.AsyncClient`` per upstream name."""
+
+    def __init__(self, upstreams: Optional[Dict[str, UpstreamConfig]] = None):
+        self.upstreams: Dict[str, UpstreamConfig] = dict(DEFAULT_UPSTREAMS)
+        if upstreams:
+            self.upstreams.update(upstreams)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """Return the shared client for ``upstream``, creating it on first use."""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            config = self.upstreams.get(upstream, FALLBACK_UPSTREAM)
+            client = httpx.AsyncClient(
+                http2=config.http2 and HTTP2_AVAILABLE,
+                limits=config.limits(),
+                timeout=config.timeout(),
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close every client; called from the owning app's lifespan shutdown."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
@@ -0,0 +1,247 @@
+"""
+Persistent local store of every place observed through Google Places calls.
+
+Each place is stored once by ``place_id`` with its types, location, rating,
+the business categories it was found under and when it was last seen. An
+SQLite R-tree indexes the locations, so "how many cafes within 800 m of
+here" is answered with a bounding-box lookup plus an exact haversine filter.
+
+The store also records *coverage*: circles for which a complete live search
+of a category was made. ``count_if_covered`` only answers locally when a
+fresh coverage circle for the category fully contains the query circle;
+otherwise it returns ``None`` and the caller should do a live search.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.geo import EARTH_RADIUS_M, haversine_m
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Return ``(min_lat, max_lat, min_lng, max_lng)`` enclosing the circle."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlng = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def normalize_category(category: str) -> str:
+    return "_".join(category.lower().split())
+
+
+class PlaceStore:
+    """SQLite-backed spatial store of observed places and search coverage."""
+
+    def __init__(self, db_path: str = "place_store.sqlite3", max_age_seconds: float = 7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS places (
+                id INTEGER PRIMARY KEY,
+                place_id TEXT NOT NULL UNIQUE,
+                name TEXT,
+                types TEXT NOT NULL DEFAULT '[]',
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                rating REAL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS place_categories (
+                place_id TEXT NOT NULL,
+                category TEXT NOT NULL,
+                PRIMARY KEY (place_id, category)
+            );
+            CREATE INDEX IF NOT EXISTS place_categories_category ON place_categories (category);
+            CREATE TABLE IF NOT EXISTS coverage (
+                id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                radius_m REAL NOT NULL,
+                searched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coverage_category ON coverage (category, searched_at);
+            """
+        )
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS places_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+            )
+            self.has_rtree = True
+        except sqlite3.OperationalError:
+            # SQLite built without R-tree support: fall back to a plain index
+            self._conn.execute("CREATE INDEX IF NOT EXISTS places_location ON places (latitude, longitude)")
+            self.has_rtree = False
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> "PlaceStore":
+        """Build a store from ``PLACE_STORE_*`` environment variables."""
+        return cls(
+            db_path=os.getenv("PLACE_STORE_PATH", "place_store.sqlite3"),
+            max_age_seconds=float(os.getenv("PLACE_STORE_MAX_AGE_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def observe(self, places: Iterable[Dict[str, Any]], category: Optional[str] = None) -> int:
+        """Upsert raw Places (New) API results; returns how many had a location."""
+        now = time.time()
+        category = normalize_category(category) if category else None
+        stored = 0
+        with self._lock:
+            for place in places:
+                location = place.get("location") or {}
+                place_id = place.get("id")
+                if not place_id or "latitude" not in location or "longitude" not in location:
+                    continue
+                lat, lng = float(location["latitude"]), float(location["longitude"])
+                row_id = self._upsert_place(place, place_id, lat, lng, now)
+                self._index(row_id, lat, lng)
+                if category:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO place_categories (place_id, category) VALUES (?, ?)",
+                        (place_id, category),
+                    )
+                stored += 1
+            self._conn.commit()
+        return stored
+
+    def record_coverage(self, category: str, latitude: float, longitude: float, radius_m: float) -> None:
+        """Record that a complete live search of ``category`` covered this circle."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO coverage (category, latitude, longitude, radius_m, searched_at) VALUES (?, ?, ?, ?, ?)",
+                (normalize_category(category), latitude, longitude, radius_m, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM coverage WHERE searched_at < ?", (time.time() - self.max_age_seconds,)
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def is_covered(self, category: str, latitude: float, longitude: float, radius_m: float,
+                   max_age_seconds: Optional[float] = None) -> bool:
+        """True when a fresh coverage circle for ``category`` contains the query circle."""
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT latitude, longitude, radius_m FROM coverage WHERE category = ? AND searched_at >= ?",
+                (normalize_category(category), time.time() - max_age),
+            ).fetchall()
+        return any(
+            haversine_m(latitude, longitude, c_lat, c_lng) + radius_m <= c_radius
+            for c_lat, c_lng, c_radius in rows
+        )
+
+    def places_within(self, category: str, latitude: float, longitude: float, radius_m: float,
+                      min_rating: float = 0.0, max_age_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Places observed under ``category`` (or with it as a Places type) within the circle."""
+        category = normalize_category(category)
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        seen_after = time.time() - max_age
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_m)
+        if self.has_rtree:
+            candidates_sql = (
+                "SELECT p.place_id, p.name, p.types, p.latitude, p.longitude, p.rating, p.last_seen"
+                " FROM places_rtree r JOIN places p ON p.id = r.id"
+                " WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lng >= ? AND r.min_lng <= ?"
+            )
+        else:
+            candidates_sql = (
+                "SELECT place_id, name, types, latitude, longitude, rating, last_seen FROM places p"
+                " WHERE p.latitude BETWEEN ? AND ? AND p.longitude BETWEEN ? AND ?"
+            )
+        with self._lock:
+            rows = self._conn.execute(candidates_sql, (min_lat, max_lat, min_lng, max_lng)).fetchall()
+            in_category = {
+                row[0] for row in self._conn.execute(
+                    "SELECT place_id FROM place_categories WHERE category = ?", (category,)
+                )
+            } if rows else set()
+
+        results = []
+        for place_id, name, types_json, lat, lng, rating, last_seen in rows:
+            types = json.loads(types_json)
+            if place_id not in in_category and category not in types:
+                continue
+            if last_seen < seen_after:
+                continue
+            if min_rating and (rating is None or rating < min_rating):
+                continue
+            if haversine_m(latitude, longitude, lat, lng) > radius_m:
+                continue
+            results.append({
+                "place_id": place_id, "name": name, "types": types,
+                "latitude": lat, "longitude": lng, "rating": rating, "last_seen": last_seen,
+            })
+        return results
+
+    def count_if_covered(self, category: str, latitude: float, longitude: float, radius_m: float,
+                         min_rating: float = 0.0, max_age_seconds: Optional[float] = None) -> Optional[int]:
+        """Count matching places locally, or ``None`` if the area needs a live refresh."""
+        if not self.is_covered(category, latitude, longitude, radius_m, max_age_seconds):
+            return None
+        return len(self.places_within(category, latitude, longitude, radius_m, min_rating, max_age_seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            places = self._conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+            coverage = self._conn.execute("SELECT COUNT(*) FROM coverage").fetchone()[0]
+        return {"places": places, "coverage_regions": coverage, "rtree": self.has_rtree}
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _upsert_place(self, place: Dict[str, Any], place_id: str, lat: float, lng: float, now: float) -> int:
+        existing = self._conn.execute(
+            "SELECT id, name, types, rating FROM places WHERE place_id = ?", (place_id,)
+        ).fetchone()
+        name = (place.get("displayName") or {}).get("text")
+        types = place.get("types")
+        rating = place.get("rating")
+        if existing is None:
+            cursor = self._conn.execute(
+                "INSERT INTO places (place_id, name, types, latitude, longitude, rating, last_seen)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (place_id, name, json.dumps(types or []), lat, lng, rating, now),
+            )
+            return cursor.lastrowid
+        # Keep previously stored fields that this (possibly narrower) projection did not include
+        row_id, old_name, old_types, old_rating = existing
+        self._conn.execute(
+            "UPDATE places SET name = ?, types = ?, latitude = ?, longitude = ?, rating = ?, last_seen = ? WHERE id = ?",
+            (
+                name if name is not None else old_name,
+                json.dumps(types) if types is not None else old_types,
+                lat, lng,
+                rating if rating is not None else old_rating,
+                now, row_id,
+            ),
+        )
+        return row_id
+
+    def _index(self, row_id: int, lat: float, lng: float) -> None:
+        if self.has_rtree:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places_rtree (id, min_lat, max_lat, min_lng, max_lng) VALUES (?, ?, ?, ?, ?)",
+                (row_id, lat, lat, lng, lng),
+            )
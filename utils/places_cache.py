@@ -0,0 +1,253 @@
+"""
+TTL cache with stale-while-revalidate for Google Places text-search results.
+
+The competitor and proximity endpoints issue the same ``"{type} in {location}"``
+searches over and over. ``PlacesSearchCache`` sits in front of those calls:
+
+- entries are keyed by the normalized query text, page size, min rating,
+  open-now flag and field mask;
+- a fresh entry (younger than ``ttl_seconds``) is returned directly;
+- a stale entry (younger than ``ttl_seconds + stale_seconds``) is returned
+  immediately while a single background task refreshes it;
+- the in-memory LRU is bounded by the JSON-encoded size of its entries;
+- an optional SQLite file lets the cache survive restarts.
+
+Concurrent misses for the same key share a single upstream request. One
+cache may be used from several event loops (e.g. an app loop and a
+``BackgroundLoop``): entries are shared under a lock, while in-flight
+requests are shared only between callers on the same loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+Fetch = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+class SqliteCacheBackend:
+    """Persistent key/value store for cache entries, bounded by total bytes."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS places_cache ("
+            " key TEXT PRIMARY KEY, payload TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load(self, key: str) -> Optional[Tuple[str, float]]:
+        row = self._conn.execute(
+            "SELECT payload, stored_at FROM places_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def store(self, key: str, payload: str, stored_at: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO places_cache (key, payload, stored_at, size) VALUES (?, ?, ?, ?)",
+            (key, payload, stored_at, len(payload)),
+        )
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM places_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop the oldest entries until we are back under the bound
+            rows = self._conn.execute("SELECT key, size FROM places_cache ORDER BY stored_at").fetchall()
+            for old_key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM places_cache WHERE key = ?", (old_key,))
+                total -= size
+        self._conn.commit()
+
+    def purge_expired(self, max_age_seconds: float) -> None:
+        self._conn.execute("DELETE FROM places_cache WHERE stored_at < ?", (time.time() - max_age_seconds,))
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class PlacesSearchCache:
+    """In-memory LRU of Places search results with optional persistence."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = 900.0,
+        stale_seconds: float = 3600.0,
+        max_bytes: int = 32 * 1024 * 1024,
+        db_path: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self.backend = SqliteCacheBackend(db_path, max_bytes) if db_path else None
+        if self.backend:
+            self.backend.purge_expired(ttl_seconds + stale_seconds)
+
+        # key -> (places, stored_at, size_in_bytes), most recently used last
+        self._entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # (event loop, key) -> fetch task; a task can only be awaited on its own loop
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "PlacesSearchCache":
+        """Build a cache from ``PLACES_CACHE_*`` environment variables."""
+        return cls(
+            ttl_seconds=float(os.getenv("PLACES_CACHE_TTL_SECONDS", "900")),
+            stale_seconds=float(os.getenv("PLACES_CACHE_STALE_SECONDS", "3600")),
+            max_bytes=int(os.getenv("PLACES_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            db_path=os.getenv("PLACES_CACHE_PATH") or None,
+        )
+
+    @staticmethod
+    def make_key(
+        query: str,
+        page_size: int,
+        min_rating: float,
+        open_now: bool,
+        field_mask: str,
+    ) -> str:
+        """Return a stable cache key for a text search."""
+        normalized_query = " ".join(query.lower().split())
+        normalized_mask = ",".join(sorted(f.strip() for f in field_mask.split(",") if f.strip()))
+        raw = json.dumps(
+            [normalized_query, int(page_size), float(min_rating), bool(open_now), normalized_mask]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_or_fetch(self, key: str, fetch: Fetch) -> List[Dict[str, Any]]:
+        """Return cached places for ``key``, calling ``fetch`` on a miss.
+
+        Stale entries are served as-is while ``fetch`` runs in the background.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            places, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl_seconds:
+                self.hits += 1
+                return places
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                self._schedule_refresh(key, fetch)
+                return places
+
+        self.misses += 1
+        return await self._fetch_shared(key, fetch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        for task in self._refresh_tasks:
+            task.cancel()
+        if self.backend:
+            self.backend.close()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _lookup(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        with self._lock:
+            return self._lookup_locked(key)
+
+    def _lookup_locked(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+        if self.backend:
+            row = self.backend.load(key)
+            if row is not None:
+                payload, stored_at = row
+                places = json.loads(payload)
+                self._remember(key, places, stored_at, len(payload))
+                return places, stored_at
+        return None
+
+    def _store(self, key: str, places: List[Dict[str, Any]]) -> None:
+        payload = json.dumps(places, separators=(",", ":"))
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, places, stored_at, len(payload))
+            if self.backend:
+                try:
+                    self.backend.store(key, payload, stored_at)
+                except sqlite3.Error as e:
+                    logger.warning("Could not persist Places cache entry: %s", e)
+
+    def _remember(self, key: str, places: List[Dict[str, Any]], stored_at: float, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2]
+        self._entries[key] = (places, stored_at, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    async def _fetch_shared(self, key: str, fetch: Fetch) -> List[Dict[str, Any]]:
+        # The fetch runs in a task owned by the cache, so a cancelled caller only
+        # stops waiting; the other callers sharing the key still get the result
+        inflight_key = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(inflight_key, done))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, key: str, fetch: Fetch) -> List[Dict[str, Any]]:
+        places = await fetch()
+        self._store(key, places)
+        return places
+
+    def _forget_inflight(self, key: Tuple[asyncio.AbstractEventLoop, str], task: "asyncio.Future[List[Dict[str, Any]]]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone away
+            task.exception()
+
+    def _schedule_refresh(self, key: str, fetch: Fetch) -> None:
+        if (asyncio.get_running_loop(), key) in self._inflight:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._fetch_shared(key, fetch)
+            except Exception as e:
+                logger.warning("Background Places cache refresh failed: %s", e)
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
@@ -0,0 +1,73 @@
+"""
+Named field-mask profiles for Google Places (New) searches.
+
+Places bills and sizes each response by the fields requested in
+``X-Goog-FieldMask``, so every caller should ask only for what it uses:
+
+- ``count``: place ids, locations and types only, for endpoints that just
+  count results;
+- ``summary``: name, address, rating and price level, as used by the
+  proximity service and API;
+- ``full``: everything the competitor analysis parses, including reviews,
+  opening hours, phone and website.
+
+Example:
+    >>> field_mask("count", paginated=True)
+    'places.id,places.location,places.types,nextPageToken'
+"""
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, Tuple
+
+# Location and types are in every profile so each response can feed the
+# local PlaceStore (see utils/place_store.py)
+COUNT_FIELDS: Tuple[str, ...] = ("id", "location", "types")
+
+SUMMARY_FIELDS: Tuple[str, ...] = COUNT_FIELDS + (
+    "displayName",
+    "formattedAddress",
+    "rating",
+    "userRatingCount",
+    "priceLevel",
+)
+
+FULL_FIELDS: Tuple[str, ...] = SUMMARY_FIELDS + (
+    "businessStatus",
+    "websiteUri",
+    "nationalPhoneNumber",
+    "regularOpeningHours",
+    "reviews",
+)
+
+FIELD_PROFILES: Dict[str, Tuple[str, ...]] = {
+    "count": COUNT_FIELDS,
+    "summary": SUMMARY_FIELDS,
+    "full": FULL_FIELDS,
+}
+
+
+def _profile(profile: str) -> Tuple[str, ...]:
+    try:
+        return FIELD_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown field-mask profile '{profile}'. Expected one of: {', '.join(FIELD_PROFILES)}"
+        ) from None
+
+
+def profile_fields(profile: str) -> FrozenSet[str]:
+    """Return the place-level field names (without ``places.``) in ``profile``."""
+    return frozenset(_profile(profile))
+
+
+def field_mask(profile: str, *, paginated: bool = False) -> str:
+    """Build the ``X-Goog-FieldMask`` header value for ``profile``.
+
+    Args:
+        profile: One of ``count``, ``summary`` or ``full``.
+        paginated: Also request ``nextPageToken`` so results can be paged.
+    """
+    fields = [f"places.{name}" for name in _profile(profile)]
+    if paginated:
+        fields.append("nextPageToken")
+    return ",".join(fields)
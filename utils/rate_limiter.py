@@ -0,0 +1,81 @@
+"""
+Client-side rate limiting and retry backoff helpers for upstream APIs.
+
+``AdaptiveRateLimiter`` spaces requests out at a target rate that grows
+additively while calls succeed and is cut multiplicatively when the upstream
+answers 429, honouring any ``Retry-After`` it sends. ``backoff_delay`` gives the
+"full jitter" exponential delay used between retries.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def backoff_delay(attempt: int, *, base: float = 0.5, cap: float = 10.0) -> float:
+    """Return a random delay in ``[0, min(cap, base * 2**attempt)]`` seconds."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header (seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """AIMD limiter: ``+increase`` req/s per success, ``*decrease`` per 429."""
+
+    def __init__(
+        self,
+        *,
+        rate: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float = 20.0,
+        increase: float = 0.25,
+        decrease: float = 0.5,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+
+    async def acquire(self) -> None:
+        """Wait for the next request slot."""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._blocked_until)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429, pausing all callers for ``retry_after`` seconds."""
+        self.throttled += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
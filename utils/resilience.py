@@ -0,0 +1,373 @@
+"""
+Shared resilience layer for calls to upstream APIs.
+
+``ResilienceRegistry`` keeps one ``ResilientUpstream`` per upstream name
+(Google Places, Tavily, OpenAI, ...). Wrapping a call with
+``upstream.call(...)`` gives it:
+
+- a circuit breaker that fails fast with ``CircuitOpenError`` after repeated
+  timeouts, connection errors or 5xx answers, and lets a single probe through
+  once ``reset_timeout`` has passed;
+- a per-attempt timeout, shortened to whatever is left of the caller's
+  deadline (see ``deadline``);
+- retries with full-jitter backoff for idempotent calls;
+- optional hedging: when an attempt is slower than the upstream's observed
+  p95 latency, a duplicate request is fired and the first answer wins.
+
+Example:
+    >>> resilience = ResilienceRegistry()
+    >>> with deadline(30):
+    ...     response = await resilience.get("google_places").call(
+    ...         lambda: client.post(url, json=payload), hedge=True
+    ...     )
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional
+
+import httpx
+
+from utils.rate_limiter import backoff_delay
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("upstream_deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the caller's deadline leaves no time for another attempt."""
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound every upstream call made in this context (and tasks it creates) to ``seconds``."""
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or ``None`` when there is none."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def blocking_timeout(timeout: Optional[float] = None) -> Optional[float]:
+    """``timeout`` shortened to the current deadline, for blocking waits made outside ``call``."""
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0.0)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    return getattr(error, "status_code", None)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Timeouts, connection errors and 5xx answers count against the breaker."""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    status = status_code_of(error)
+    return status is not None and status >= 500
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Upstream failures plus 429s are worth retrying."""
+    return is_upstream_failure(error) or status_code_of(error) == 429
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    """Timeout, retry, breaker and hedging settings for a single upstream."""
+
+    timeout: float = 15.0
+    max_retries: int = 2
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    hedge: bool = False
+    hedge_min_delay: float = 0.05
+    hedge_budget: float = 0.1  # at most this fraction of calls may be hedged
+    latency_window: int = 200
+    min_latency_samples: int = 20
+
+
+# Places searches are cheap, read-only and latency sensitive, so they are
+# hedged. Tavily is rate limited and OpenAI is billed per call, so neither is
+# hedged and OpenAI relies on the SDK's own single retry.
+DEFAULT_POLICIES: Dict[str, UpstreamPolicy] = {
+    "google_places": UpstreamPolicy(timeout=10.0, max_retries=2, hedge=True),
+    "tavily": UpstreamPolicy(timeout=20.0, max_retries=3),
+    "openai": UpstreamPolicy(timeout=20.0, max_retries=0),
+    "nominatim": UpstreamPolicy(timeout=10.0, max_retries=1),
+    "google_maps": UpstreamPolicy(timeout=10.0, max_retries=2),
+}
+
+FALLBACK_POLICY = UpstreamPolicy()
+
+
+class CircuitBreaker:
+    """Closed → open after ``failure_threshold`` consecutive failures → half-open probe."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError("Upstream circuit is open; failing fast")
+
+    def on_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def on_failure(self) -> None:
+        self.consecutive_failures += 1
+        was_probe, self._probe_in_flight = self._probe_in_flight, False
+        if was_probe or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+            self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+    def on_ignored(self) -> None:
+        """A call ended without telling us anything about upstream health."""
+        self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ResilientUpstream:
+    """Breaker, timeouts, retries and hedging for calls to one upstream."""
+
+    def __init__(self, name: str, policy: UpstreamPolicy = FALLBACK_POLICY):
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.latency = LatencyTracker(policy.latency_window, policy.min_latency_samples)
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        idempotent: bool = True,
+        hedge: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+        failure: Callable[[BaseException], bool] = is_upstream_failure,
+        before_attempt: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Run ``fn()`` (a zero-argument coroutine factory, called once per
+        attempt) under this upstream's policy. Only idempotent calls are
+        retried or hedged.
+
+        ``before_attempt`` (e.g. a rate limiter's ``acquire``) is awaited
+        before every attempt, outside the attempt timeout: waiting for our
+        own pacing is not an upstream failure. It is still bounded by the
+        caller's deadline.
+        """
+        self.calls += 1
+        hedge = self.policy.hedge if hedge is None else hedge
+        max_retries = self.policy.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            if before_attempt is not None:
+                await self._wait_before_attempt(before_attempt)
+            self.breaker.before_call()
+            attempt_timeout = self._attempt_timeout(timeout)
+            started = time.monotonic()
+            try:
+                result = await self._attempt(fn, attempt_timeout, hedge and idempotent)
+            except asyncio.CancelledError:
+                self.breaker.on_ignored()
+                raise
+            except Exception as e:
+                if failure(e):
+                    self.failures += 1
+                    self.breaker.on_failure()
+                else:
+                    self.breaker.on_ignored()
+                if not idempotent or attempt >= max_retries or not retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - started)
+            self.breaker.on_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "rejected": self.breaker.rejected,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+    def _attempt_timeout(self, timeout: Optional[float]) -> float:
+        attempt_timeout = self.policy.timeout if timeout is None else timeout
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline passed before calling {self.name}")
+            attempt_timeout = min(attempt_timeout, remaining)
+        return attempt_timeout
+
+    async def _wait_before_attempt(self, before_attempt: Callable[[], Awaitable[Any]]) -> None:
+        remaining = remaining_time()
+        if remaining is None:
+            await before_attempt()
+            return
+        try:
+            await asyncio.wait_for(before_attempt(), max(remaining, 0.0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline passed while waiting to call {self.name}") from None
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedges >= self.policy.hedge_budget * self.calls:
+            return None
+        p95 = self.latency.percentile(95)
+        return None if p95 is None else max(p95, self.policy.hedge_min_delay)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[Any]], timeout: float, hedge: bool) -> Any:
+        hedge_delay = self._hedge_delay() if hedge else None
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await asyncio.wait_for(fn(), timeout)
+
+        expires_at = time.monotonic() + timeout
+        primary = asyncio.ensure_future(fn())
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            backup = asyncio.ensure_future(fn())
+            tasks.add(backup)
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=max(0.0, expires_at - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+class ResilienceRegistry:
+    """Lazily creates one ``ResilientUpstream`` per upstream name."""
+
+    def __init__(self, policies: Optional[Dict[str, UpstreamPolicy]] = None):
+        self.policies: Dict[str, UpstreamPolicy] = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self._upstreams: Dict[str, ResilientUpstream] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResilienceRegistry":
+        """
+        Apply ``BREAKER_FAILURE_THRESHOLD``, ``BREAKER_RESET_SECONDS`` and
+        ``HEDGE_UPSTREAMS`` (comma-separated upstream names, or ``none``) on
+        top of the default policies.
+        """
+        hedged = os.getenv("HEDGE_UPSTREAMS")
+        hedged_names = None if hedged is None else {n.strip() for n in hedged.split(",") if n.strip()}
+        policies = {}
+        for name, policy in DEFAULT_POLICIES.items():
+            changes: Dict[str, Any] = {}
+            if os.getenv("BREAKER_FAILURE_THRESHOLD"):
+                changes["failure_threshold"] = int(os.getenv("BREAKER_FAILURE_THRESHOLD"))
+            if os.getenv("BREAKER_RESET_SECONDS"):
+                changes["reset_timeout"] = float(os.getenv("BREAKER_RESET_SECONDS"))
+            if hedged_names is not None:
+                changes["hedge"] = name in hedged_names
+            policies[name] = replace(policy, **changes)
+        return cls(policies)
+
+    def get(self, upstream: str) -> ResilientUpstream:
+        resilient = self._upstreams.get(upstream)
+        if resilient is None:
+            resilient = ResilientUpstream(upstream, self.policies.get(upstream, FALLBACK_POLICY))
+            self._upstreams[upstream] = resilient
+        return resilient
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: upstream.stats() for name, upstream in self._upstreams.items()}